@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# builds a synthetic project to munch, shaped like the files in demo/
+#
+# usage: python benchmarks/corpus.py {directory} [--classes 400] [--ids 80] [--views 50]
+#            [--stylesheets 5] [--js 5] [--density 0.5] [--seed 1]
+#
+# the same options and seed always build exactly the same files.  density is
+# roughly how many elements in a view and statements in a js file use a class
+# or id, from 0 to 1.
+
+import sys, os, getopt, random
+
+WORDS = ["header", "footer", "nav", "menu", "item", "link", "button", "primary", "secondary", "active",
+    "disabled", "title", "content", "sidebar", "widget", "panel", "list", "grid", "row", "column",
+    "large", "small", "hidden", "selected", "box", "red", "blue", "green", "purple", "italic"]
+
+PROPERTIES = ["color: %(color)s;", "font-size: %(number)sem;", "padding: %(number)spx;", "margin: 0 %(number)spx;", "letter-spacing: .%(number)sem;", "border: 1px solid %(color)s;"]
+COLORS = ["red", "blue", "green", "purple", "orange", "grey", "#333", "#fafafa"]
+
+TEXT = "Assertively leverage existing scalable growth strategies with revolutionary value. Distinctively recaptiualize top-line models rather than leveraged e-commerce."
+
+defaults = {"classes": 400, "ids": 80, "views": 50, "stylesheets": 5, "js": 5, "density": 0.5, "seed": 1}
+
+def getNames(rand, count, used):
+    """makes up unique names out of a couple of words"""
+    names = []
+    while len(names) < count:
+        name = "_".join(rand.sample(WORDS, rand.randint(1, 3)))
+        if len(used) > len(WORDS) * 10:
+            name += str(len(used))
+        if name in used:
+            continue
+        used.add(name)
+        names.append(name)
+    return names
+
+def getRule(rand, selector):
+    properties = rand.sample(PROPERTIES, rand.randint(1, 3))
+    lines = ["    " + property % {"color": rand.choice(COLORS), "number": rand.randint(1, 20)} for property in properties]
+    return selector + " {\n" + "\n".join(lines) + "\n}\n"
+
+def buildCss(rand, classes, ids, rules):
+    """a stylesheet with plain, compound and grouped selectors"""
+    parts = ["body {\n    font-family: helvetica;\n}\n"]
+    for i in range(rules):
+        kind = rand.random()
+        if kind < 0.5:
+            selector = "." + rand.choice(classes)
+        elif kind < 0.7:
+            selector = "#" + rand.choice(ids)
+        elif kind < 0.85:
+            selector = "." + rand.choice(classes) + "." + rand.choice(classes)
+        else:
+            selector = ", ".join("#" + name for name in rand.sample(ids, min(len(ids), 3)))
+        parts.append(getRule(rand, selector))
+    return "\n".join(parts)
+
+def buildView(rand, classes, ids, elements, density, stylesheets, scripts):
+    """a page with paragraphs, a few of them using classes and ids"""
+    lines = ["<html>", "<head>", "    <title>generated page</title>"]
+    for stylesheet in stylesheets:
+        lines.append('    <link href="../css/' + stylesheet + '" rel="stylesheet" type="text/css" />')
+    lines.append("    <style>\n        ." + rand.choice(classes) + " {\n            color: red;\n        }\n    </style>")
+    lines += ["</head>", "<body>"]
+    for i in range(elements):
+        attributes = ""
+        if rand.random() < density:
+            attributes += ' class="' + " ".join(rand.sample(classes, rand.randint(1, 3))) + '"'
+        if rand.random() < density / 4:
+            attributes += ' id="' + rand.choice(ids) + '"'
+        lines.append("    <p" + attributes + ">" + TEXT + "</p>")
+    for script in scripts:
+        lines.append('    <script type="text/javascript" src="../js/' + script + '"></script>')
+    lines += ["</body>", "</html>", ""]
+    return "\n".join(lines)
+
+def buildJs(rand, classes, ids, statements, density):
+    """a script that uses the default selectors and document.querySelector"""
+    lines = ["window.onload = function()", "{"]
+    for i in range(statements):
+        if rand.random() >= density:
+            lines.append("    var value" + str(i) + " = " + str(i) + " * 2; // nothing to see here")
+            continue
+
+        kind = rand.randint(0, 3)
+        if kind == 0:
+            lines.append('    document.getElementById("' + rand.choice(ids) + '").innerHTML = "text";')
+        elif kind == 1:
+            lines.append("    var elements" + str(i) + " = document.getElementsByClassName('" + rand.choice(classes) + "');")
+        elif kind == 2:
+            lines.append('    document.querySelector(".' + rand.choice(classes) + ' #' + rand.choice(ids) + '").value;')
+        else:
+            lines.append('    element.addClass("' + rand.choice(classes) + '");')
+    lines += ["}", ""]
+    return "\n".join(lines)
+
+def writeFile(path, contents):
+    file = open(path, "w")
+    file.write(contents)
+    file.close()
+
+def generate(path, classes = 400, ids = 80, views = 50, stylesheets = 5, js = 5, density = 0.5, seed = 1):
+    """builds a project in path with css/, views/ and js/ directories"""
+    rand = random.Random(seed)
+    used = set()
+    class_names = getNames(rand, classes, used)
+    id_names = getNames(rand, ids, used)
+
+    for directory in ("css", "views", "js"):
+        if not os.path.isdir(os.path.join(path, directory)):
+            os.makedirs(os.path.join(path, directory))
+
+    stylesheet_names = ["stylesheet" + str(i) + ".css" for i in range(stylesheets)]
+    script_names = ["script" + str(i) + ".js" for i in range(js)]
+    rules = max(1, (classes + ids) // max(1, stylesheets))
+
+    for name in stylesheet_names:
+        writeFile(os.path.join(path, "css", name), buildCss(rand, class_names, id_names, rules))
+
+    for i in range(views):
+        linked = rand.sample(stylesheet_names, min(2, len(stylesheet_names)))
+        scripts = rand.sample(script_names, min(1, len(script_names)))
+        writeFile(os.path.join(path, "views", "view" + str(i) + ".html"), buildView(rand, class_names, id_names, 40, density, linked, scripts))
+
+    for name in script_names:
+        writeFile(os.path.join(path, "js", name), buildJs(rand, class_names, id_names, 200, density))
+
+def parseArgs(args):
+    """turns command line options into keyword arguments for generate"""
+    opts, args = getopt.getopt(args, "", [key + "=" for key in defaults])
+    options = dict(defaults)
+    for key, value in opts:
+        key = key[2:]
+        options[key] = float(value) if key == "density" else int(value)
+    return options, args
+
+def main():
+    options, args = parseArgs(sys.argv[1:])
+    if len(args) != 1:
+        print "usage: python benchmarks/corpus.py {directory} [--classes 400] [--ids 80] [--views 50] [--stylesheets 5] [--js 5] [--density 0.5] [--seed 1]"
+        sys.exit(2)
+
+    generate(args[0], **options)
+    print "generated a project in " + args[0]
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# times every phase of a munch run on a generated project
+#
+# usage: python benchmarks/suite.py [--size small|medium|large] [--repeat 3] [--label name]
+#            [--history benchmarks/history.json] [--baseline label] [--threshold 10] [--no-save]
+#
+# each phase is run --repeat times on a project from benchmarks/corpus.py and
+# the fastest time is kept.  peak memory for each phase comes from tracemalloc
+# when it is available and from the peak resident size otherwise, which linux
+# lets us reset before every phase.  where it can not be reset only one peak
+# for the whole process is recorded, as the total.  every result is added to a
+# json history and compared against the first result for the same project (or
+# the latest one with the --baseline label).  the script exits with 1 if any
+# phase got slower than --threshold percent.
+
+import sys, os, time, getopt, json, tempfile, shutil, platform
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from muncher.config import Config
+from muncher.muncher import Muncher
+from muncher.sizetracker import SizeTracker
+from muncher.util import Util
+import corpus
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sizes = {
+    "small": {"classes": 100, "ids": 20, "views": 10, "stylesheets": 2, "js": 2},
+    "medium": {"classes": 400, "ids": 80, "views": 50, "stylesheets": 5, "js": 5},
+    "large": {"classes": 2000, "ids": 400, "views": 400, "stylesheets": 20, "js": 20}
+}
+
+phases = ["scan", "maps", "css", "html", "js", "sizes"]
+
+class Memory(object):
+    """measures peak memory for one phase at a time"""
+    def __init__(self):
+        self.source = None
+        if tracemalloc is not None:
+            tracemalloc.start()
+            self.source = "tracemalloc"
+        elif Memory.resetPeakRss():
+            self.source = "peak rss"
+        elif resource is not None:
+            self.source = "max rss of the whole process"
+
+    @staticmethod
+    def resetPeakRss():
+        """resets the peak resident size of the process to its current size (linux only)"""
+        try:
+            file = open("/proc/self/clear_refs", "w")
+            try:
+                file.write("5")
+            finally:
+                file.close()
+        except (IOError, OSError):
+            return False
+        return Memory.getPeakRss() is not None
+
+    @staticmethod
+    def getPeakRss():
+        """peak resident size since the last reset in bytes"""
+        try:
+            for line in open("/proc/self/status"):
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+        except (IOError, OSError, ValueError):
+            pass
+        return None
+
+    def reset(self):
+        if self.source == "tracemalloc":
+            tracemalloc.stop()
+            tracemalloc.start()
+        elif self.source == "peak rss":
+            Memory.resetPeakRss()
+
+    def getPeak(self):
+        """peak bytes during the phase, or None when only the whole process can be measured"""
+        if self.source == "tracemalloc":
+            return tracemalloc.get_traced_memory()[1]
+        if self.source == "peak rss":
+            return Memory.getPeakRss()
+        return None
+
+    def getProcessPeak(self):
+        """peak resident size of the whole process, for when phases can not be measured"""
+        if resource is None:
+            return None
+        # linux reports kilobytes and os x reports bytes
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def getConfig(path):
+    config = Config()
+    config.css = [os.path.join(path, "css")]
+    config.views = [os.path.join(path, "views")]
+    config.js = [os.path.join(path, "js")]
+    return config
+
+def runOnce(path, memory):
+    """runs every phase once and returns {phase: (seconds, peak memory)}"""
+    for directory in ("css_opt", "views_opt", "js_opt"):
+        Util.unlinkDir(os.path.join(path, directory))
+
+    SizeTracker.original_sizes = {}
+    SizeTracker.new_sizes = {}
+    SizeTracker.files = []
+
+    muncher = Muncher(getConfig(path))
+    config = muncher.config
+    steps = [
+        ("scan", muncher.processFiles),
+        ("maps", muncher.processMaps),
+        ("css", lambda: muncher.optimizeFiles(config.css, muncher.optimizeCss)),
+        ("html", lambda: muncher.optimizeFiles(config.views, muncher.optimizeHtml, config.view_extension)),
+        ("js", lambda: muncher.optimizeFiles(config.js, muncher.optimizeJavascript)),
+        ("sizes", lambda: trackSizes(muncher))
+    ]
+
+    results = {}
+    for name, step in steps:
+        memory.reset()
+        start = time.time()
+        step()
+        results[name] = (time.time() - start, memory.getPeak())
+
+    return results
+
+def trackSizes(muncher):
+    for file, callback, minimize, new_path in muncher.getAllOptimizeTasks():
+        SizeTracker.trackFile(file, new_path if new_path is not None else Util.prependExtension("opt", file))
+
+def run(options, repeat):
+    """generates a project and keeps the fastest time for each phase"""
+    path = tempfile.mkdtemp(prefix = "munch-bench-")
+    try:
+        corpus.generate(path, **options)
+        memory = Memory()
+        best = {}
+        for i in range(repeat):
+            for name, (seconds, peak) in runOnce(path, memory).iteritems():
+                if name not in best:
+                    best[name] = {"seconds": seconds, "peak_memory": peak}
+                    continue
+                best[name]["seconds"] = min(best[name]["seconds"], seconds)
+                best[name]["peak_memory"] = max(best[name]["peak_memory"], peak)
+        return best, memory
+    finally:
+        shutil.rmtree(path, True)
+
+def loadHistory(path):
+    if not os.path.isfile(path):
+        return []
+    return json.loads(Util.fileGetContents(path))
+
+def findBaseline(history, corpus_options, label = None):
+    """the latest result with the label, or the first one for the same project"""
+    matches = [entry for entry in history if entry["corpus"] == corpus_options]
+    if label is not None:
+        matches = [entry for entry in matches if entry.get("label") == label]
+        return matches[-1] if matches else None
+    return matches[0] if matches else None
+
+def compare(result, baseline, threshold):
+    """prints every phase next to the baseline and returns the phases that got slower"""
+    regressions = []
+    print "%-8s %12s %14s %12s" % ("phase", "seconds", "peak memory", "change")
+    for name in phases + ["total"]:
+        phase = result["phases"][name]
+        line = "%-8s %12.4f %14s" % (name, phase["seconds"], SizeTracker.getSize(phase["peak_memory"]) if phase["peak_memory"] is not None else "-")
+        if baseline is not None and name in baseline["phases"]:
+            before = baseline["phases"][name]["seconds"]
+            change = (phase["seconds"] - before) / before * 100 if before > 0 else 0.0
+            line += " %+11.1f%%" % change
+            if change > threshold:
+                regressions.append(name)
+                line += "  slower"
+        print line
+    return regressions
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "", ["size=", "repeat=", "label=", "history=", "baseline=", "threshold=", "no-save"])
+    except getopt.GetoptError:
+        print "usage: python benchmarks/suite.py [--size small|medium|large] [--repeat 3] [--label name] [--history path] [--baseline label] [--threshold 10] [--no-save]"
+        sys.exit(2)
+
+    size = "medium"
+    repeat = 3
+    label = None
+    history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.json")
+    baseline_label = None
+    threshold = 10.0
+    save = True
+    for key, value in opts:
+        if key == "--size":
+            size = value
+        elif key == "--repeat":
+            repeat = int(value)
+        elif key == "--label":
+            label = value
+        elif key == "--history":
+            history_path = value
+        elif key == "--baseline":
+            baseline_label = value
+        elif key == "--threshold":
+            threshold = float(value.rstrip("%"))
+        elif key == "--no-save":
+            save = False
+
+    options = dict(corpus.defaults)
+    options.update(sizes[size])
+
+    result_phases, memory = run(options, repeat)
+    peaks = [result_phases[name]["peak_memory"] for name in phases if result_phases[name]["peak_memory"] is not None]
+    result_phases["total"] = {
+        "seconds": sum(result_phases[name]["seconds"] for name in phases),
+        "peak_memory": max(peaks) if peaks else memory.getProcessPeak()
+    }
+
+    result = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "label": label,
+        "python": platform.python_version(),
+        "size": size,
+        "corpus": options,
+        "repeat": repeat,
+        "memory": memory.source,
+        "phases": result_phases
+    }
+
+    history = loadHistory(history_path)
+    baseline = findBaseline(history, options, baseline_label)
+
+    print "%s project, fastest of %d runs, python %s\n" % (size, repeat, result["python"])
+    regressions = compare(result, baseline, threshold)
+
+    if baseline is None:
+        print "\nno baseline to compare with yet"
+    else:
+        print "\ncompared with the run from " + baseline["time"] + (" (" + baseline["label"] + ")" if baseline.get("label") else "")
+
+    if save:
+        history.append(result)
+        Util.filePutContents(history_path, json.dumps(history, indent = 2, sort_keys = True) + "\n")
+
+    if regressions:
+        print "slower than " + str(threshold) + "% over the baseline: " + ", ".join(regressions)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# measures how much latency MunchMiddleware adds to each request
+#
+# usage: python benchmarks/wsgi_latency.py [requests] [chunks per response]
+#
+# the demo views are served by a small wsgi app, once directly, once through
+# the middleware with its cache turned off and once with a warm cache.
+
+import sys, os, time, tempfile
+from wsgiref.util import setup_testing_defaults
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from muncher.config import Config
+from muncher.muncher import Muncher
+from muncher.middleware import MunchMiddleware
+from muncher.util import Util
+
+def buildMap(path):
+    """munches the demo files in memory and saves the map"""
+    muncher = Muncher(Config())
+    for file in muncher.getFiles([ROOT + "/demo/css"]):
+        muncher.processContents(Util.fileGetContents(file), "css")
+    for file in muncher.getFiles([ROOT + "/demo/views", ROOT + "/demo/single-file"]):
+        muncher.processContents(Util.fileGetContents(file), "html")
+    muncher.processMaps()
+    muncher.saveMap(path)
+
+def buildApp(pages, chunks):
+    """wsgi app that serves the demo pages split into a number of chunks"""
+    state = {"request": 0}
+
+    def app(environ, start_response):
+        page = pages[state["request"] % len(pages)]
+        state["request"] += 1
+        size = len(page) // chunks + 1
+        start_response("200 OK", [("Content-Type", "text/html; charset=utf-8"), ("Content-Length", str(len(page)))])
+        return [page[i:i + size] for i in range(0, len(page), size)]
+
+    return app
+
+def measure(app, requests):
+    """calls the app a number of times and returns the latency of each call in microseconds"""
+    timings = []
+    for i in range(requests):
+        environ = {}
+        setup_testing_defaults(environ)
+        start = time.time()
+        body = "".join(app(environ, lambda status, headers, exc_info = None: None))
+        timings.append((time.time() - start) * 1000000)
+    return timings
+
+def report(name, timings, baseline = None):
+    timings = sorted(timings)
+    mean = sum(timings) / len(timings)
+    line = "%-24s mean %8.1f us   p50 %8.1f us   p99 %8.1f us" % (name, mean, timings[len(timings) // 2], timings[int(len(timings) * 0.99)])
+    if baseline is not None:
+        line += "   added %8.1f us" % (mean - sum(baseline) / len(baseline))
+    print line
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    chunks = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    map_file = tempfile.NamedTemporaryFile(suffix = ".json", delete = False)
+    map_file.close()
+    try:
+        buildMap(map_file.name)
+        views = Muncher(Config()).getFiles([ROOT + "/demo/views", ROOT + "/demo/single-file"])
+        pages = [Util.fileGetContents(view) for view in views]
+
+        app = buildApp(pages, chunks)
+        print "%d requests, %d pages, %d chunks per response\n" % (requests, len(pages), chunks)
+
+        baseline = measure(app, requests)
+        report("no middleware", baseline)
+        report("middleware, no cache", measure(MunchMiddleware(app, map_file.name, cache_size = 0), requests), baseline)
+        report("middleware, warm cache", measure(MunchMiddleware(app, map_file.name), requests), baseline)
+    finally:
+        os.unlink(map_file.name)
+
+if __name__ == "__main__":
+    main()
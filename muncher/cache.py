@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os, hashlib, tempfile
+from util import Util
+
+class Cache(object):
+    """on disk cache of scan and rewrite results keyed by a hash of the file contents
+
+    every entry is a file named after its key.  reading an entry bumps its
+    modified time so that prune() can evict the least recently used entries
+    once the cache grows past its size limit.
+    """
+    def __init__(self, directory, max_size):
+        """constructor
+
+        Arguments:
+        directory -- directory to keep cache entries in
+        max_size -- maximum number of bytes to keep on disk
+
+        Returns:
+        void
+
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        if not Util.isDir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # another process may have just created it
+                if not Util.isDir(directory):
+                    raise
+
+    @staticmethod
+    def getKey(*parts):
+        """gets a cache key for a bunch of strings
+
+        Arguments:
+        parts -- strings that together determine the cached value
+
+        Returns:
+        string
+
+        """
+        digest = hashlib.sha1()
+        for part in parts:
+            digest.update(str(len(part)) + ":")
+            digest.update(part)
+        return digest.hexdigest()
+
+    def getPath(self, key):
+        """gets the path on disk for a key
+
+        Arguments:
+        key -- cache key
+
+        Returns:
+        string
+
+        """
+        return os.path.join(self.directory, key[0:2], key[2:])
+
+    def get(self, key):
+        """gets a value from the cache
+
+        Arguments:
+        key -- cache key
+
+        Returns:
+        string|None
+
+        """
+        path = self.getPath(key)
+        try:
+            file = open(path, "rb")
+        except IOError:
+            self.misses += 1
+            return None
+
+        try:
+            contents = file.read()
+        finally:
+            file.close()
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return contents
+
+    def set(self, key, contents):
+        """stores a value in the cache
+
+        the value is written to a temporary file first so other processes never see half an entry
+
+        Arguments:
+        key -- cache key
+        contents -- string to store
+
+        Returns:
+        void
+
+        """
+        path = self.getPath(key)
+        directory = os.path.dirname(path)
+        if not Util.isDir(directory):
+            try:
+                os.mkdir(directory)
+            except OSError:
+                pass
+
+        fd, temp_path = tempfile.mkstemp(dir = directory)
+        try:
+            os.write(fd, contents)
+        finally:
+            os.close(fd)
+
+        os.rename(temp_path, path)
+
+    def prune(self):
+        """removes the least recently used entries until the cache fits in its size limit
+
+        Returns:
+        int -- number of entries removed
+
+        """
+        entries = []
+        total = 0
+        for root, dirs, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+
+            Util.unlink(path)
+            total -= size
+            removed += 1
+
+        return removed
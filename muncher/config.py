@@ -15,6 +15,11 @@
 
 import sys, getopt
 from muncher import Muncher
+from util import Util
+from sizetracker import SizeTracker
+from precompressor import Precompressor
+from jslexer import JsLexer
+from mapexporter import MapExporter
 
 class Config(object):
     """configuration object for handling all config options for html-muncher"""
@@ -29,16 +34,45 @@ class Config(object):
         self.views = []
         self.js = []
         self.ignore = []
+        self.blocklist = []
+        self.lowercase_names = False
         self.class_selectors = ["getElementsByClassName", "hasClass", "addClass", "removeClass"]
         self.id_selectors = ["getElementById"]
         self.custom_selectors = ["document.querySelector"]
+        self.js_lexer = None
         self.framework = None
         self.view_extension = "html"
         self.js_manifest = None
         self.show_savings = False
+        self.compressors = ["gzip"]
+        self.compression_level = 9
+        self.savings_report = None
+        self.precompress = []
+        self.file_size_budget = None
+        self.total_size_budget = None
         self.compress_html = False
+        self.minify = False
         self.rewrite_constants = False
         self.verbose = False
+        self.profile = False
+        self.profile_top = 10
+        self.profile_dump = None
+        self.jobs = 1
+        self.stream = False
+        self.chunk_size = 1024 * 1024
+        self.cache_dir = None
+        self.cache_size = 100 * 1024 * 1024
+        self.document_cache_size = 64 * 1024 * 1024
+        self.gzip_names = False
+        self.gzip_sample_size = 1024 * 1024
+        self.map_in = None
+        self.map_out = None
+        self.map_exports = []
+        self.prune_unused = False
+        self.safelist = []
+        self.map_compact = None
+        self.watch = False
+        self.watch_interval = 0.5
 
     def getArgCount(self):
         """gets the count of how many arguments are present
@@ -62,17 +96,271 @@ class Config(object):
         for name in value.split(","):
             self.ignore.append(name)
 
+    def setBlocklist(self, value):
+        """sets words that should never be generated as new class or id names
+
+        Arguments:
+        value -- comma separated list of words
+
+        Returns:
+        void
+
+        """
+        for word in value.split(","):
+            self.blocklist.append(word.lstrip(".#"))
+
+    def setJobs(self, value):
+        """sets how many processes to use
+
+        Arguments:
+        value -- number of processes
+
+        Returns:
+        void
+
+        """
+        try:
+            self.jobs = int(value)
+        except ValueError:
+            Muncher.showUsage()
+
+        if self.jobs < 1:
+            Muncher.showUsage()
+
+    def setCacheSize(self, value):
+        """sets the maximum size of the cache directory
+
+        Arguments:
+        value -- size in bytes, can end in KB, MB or GB
+
+        Returns:
+        void
+
+        """
+        self.cache_size = Util.parseSize(value)
+        if self.cache_size is None:
+            Muncher.showUsage()
+
+    def setDocumentCacheSize(self, value):
+        """sets how many bytes of files to keep in memory between searching and rewriting
+
+        Arguments:
+        value -- size in bytes, can end in KB, MB or GB
+
+        Returns:
+        void
+
+        """
+        self.document_cache_size = Util.parseSize(value)
+        if self.document_cache_size is None:
+            Muncher.showUsage()
+
+    def setMapCompact(self, value):
+        """sets how many percent of extra bytes we accept to keep names from a previous map
+
+        Arguments:
+        value -- percent as a number
+
+        Returns:
+        void
+
+        """
+        try:
+            self.map_compact = float(value.rstrip("%"))
+        except ValueError:
+            Muncher.showUsage()
+
+    def setSafelist(self, value):
+        """sets classes and ids to keep css rules for even if nothing seems to use them
+
+        Arguments:
+        value -- comma separated list of classes or ids, * and ? match anything
+
+        Returns:
+        void
+
+        """
+        for name in value.split(","):
+            if name:
+                self.safelist.append(name)
+
+    def setMapExports(self, value):
+        """sets where to write the final maps for render time lookups
+
+        Arguments:
+        value -- comma separated list of paths ending in .py, .js, .mjs or .json
+
+        Returns:
+        void
+
+        """
+        for path in value.split(","):
+            if MapExporter.getFormat(path) is None:
+                Muncher.showUsage()
+
+            if path not in self.map_exports:
+                self.map_exports.append(path)
+
+    def setWatchInterval(self, value):
+        """sets how often to check for changed files in watch mode
+
+        Arguments:
+        value -- number of seconds
+
+        Returns:
+        void
+
+        """
+        try:
+            self.watch_interval = float(value)
+        except ValueError:
+            Muncher.showUsage()
+
+    def setCompressors(self, value):
+        """sets which compressors to measure savings with
+
+        gzip is always measured first unless it is left out, bz2 and lzma are
+        skipped with a warning if this python does not support them
+
+        Arguments:
+        value -- comma separated list of gzip, bz2 or lzma
+
+        Returns:
+        void
+
+        """
+        self.compressors = []
+        for name in value.split(","):
+            name = name.strip().lower()
+            if name not in ("gzip", "bz2", "lzma"):
+                Muncher.showUsage()
+
+            if not SizeTracker.isAvailable(name):
+                print "warning: " + name + " is not available in this python so it will not be measured"
+                continue
+
+            if name not in self.compressors:
+                self.compressors.append(name)
+
+    def setCompressionLevel(self, value):
+        """sets the compression level used when measuring savings
+
+        Arguments:
+        value -- number from 1 to 9
+
+        Returns:
+        void
+
+        """
+        try:
+            self.compression_level = int(value)
+        except ValueError:
+            Muncher.showUsage()
+
+        if self.compression_level < 1 or self.compression_level > 9:
+            Muncher.showUsage()
+
+    def setSizeBudget(self, value):
+        """sets the maximum compressed size of munched files
+
+        Arguments:
+        value -- size for any single file, optionally followed by a comma and a size for all files together
+
+        Returns:
+        void
+
+        """
+        budgets = value.split(",")
+        if len(budgets) > 2:
+            Muncher.showUsage()
+
+        if budgets[0] != "":
+            self.file_size_budget = Util.parseSize(budgets[0])
+            if self.file_size_budget is None:
+                Muncher.showUsage()
+
+        if len(budgets) == 2 and budgets[1] != "":
+            self.total_size_budget = Util.parseSize(budgets[1])
+            if self.total_size_budget is None:
+                Muncher.showUsage()
+
+    def setPrecompress(self, value):
+        """sets which compressed copies to write next to every munched file
+
+        Arguments:
+        value -- comma separated list of gzip, bz2 or xz
+
+        Returns:
+        void
+
+        """
+        self.precompress = []
+        for name in value.split(","):
+            name = Precompressor.getCompressorName(name)
+            if name is None:
+                Muncher.showUsage()
+
+            if not SizeTracker.isAvailable(name):
+                print "warning: " + name + " is not available in this python so no copies will be written with it"
+                continue
+
+            if name not in self.precompress:
+                self.precompress.append(name)
+
+    def shouldTrackSizes(self):
+        """checks if the size of every file has to be measured
+
+        Returns:
+        bool
+
+        """
+        return self.show_savings or self.savings_report is not None or self.file_size_budget is not None or self.total_size_budget is not None
+
+    def setProfileTop(self, value):
+        """sets how many of the slowest files to show when profiling
+
+        Arguments:
+        value -- number of files
+
+        Returns:
+        void
+
+        """
+        try:
+            self.profile_top = int(value)
+        except ValueError:
+            Muncher.showUsage()
+
+        self.profile = True
+
     def setCustomSelectors(self, value):
         for value in value.split(","):
             self.custom_selectors.append(value.lstrip("."))
+        self.js_lexer = None
 
     def addClassSelectors(self, value):
         for value in value.split(","):
             self.class_selectors.append(value)
+        self.js_lexer = None
 
     def addIdSelectors(self, value):
         for value in value.split(","):
             self.id_selectors.append(value)
+        self.js_lexer = None
+
+    def getJsLexer(self):
+        """gets the lexer that finds calls to any of the js selectors
+
+        the lexer is only built once and gets rebuilt if the selectors change
+
+        Returns:
+        JsLexer
+
+        """
+        if self.js_lexer is None:
+            self.js_lexer = JsLexer(self.custom_selectors + self.id_selectors + self.class_selectors)
+
+        return self.js_lexer
 
     def setCssFiles(self, value):
         for value in value.split(","):
@@ -94,6 +382,7 @@ class Config(object):
         elif self.framework == "mootools":
             self.id_selectors.append("$")
             self.custom_selectors.append("getElement")
+        self.js_lexer = None
 
     def processArgs(self):
         """processes arguments passed in via command line and sets config settings accordingly
@@ -103,7 +392,7 @@ class Config(object):
 
         """
         try:
-            opts, args = getopt.getopt(sys.argv[1:], "", ["css=", "views=", "html=", "js=", "help", "view-ext=", "ignore=", "framework=", "selectors=", "class-selectors=", "id-selectors=", "compress-html", "show-savings", "verbose", "js-manifest=", "rewrite-constants"])
+            opts, args = getopt.getopt(sys.argv[1:], "", ["css=", "views=", "html=", "js=", "help", "view-ext=", "ignore=", "blocklist=", "framework=", "selectors=", "class-selectors=", "id-selectors=", "compress-html", "minify", "lowercase-names", "show-savings", "compressors=", "compression-level=", "savings-report=", "size-budget=", "precompress=", "verbose", "profile", "profile-top=", "profile-dump=", "jobs=", "stream", "cache-dir=", "cache-size=", "document-cache-size=", "gzip-names", "map-in=", "map-out=", "map-export=", "map-compact=", "watch", "watch-interval=", "js-manifest=", "rewrite-constants", "prune-unused", "safelist="])
         except:
             Muncher.showUsage()
 
@@ -121,6 +410,8 @@ class Config(object):
                 self.setJsFiles(value)
             elif key == "--ignore":
                 self.setIgnore(value)
+            elif key == "--blocklist":
+                self.setBlocklist(value)
             elif key == "--view-ext":
                 self.view_extension = value
             elif key == "--framework":
@@ -131,12 +422,60 @@ class Config(object):
                 self.addClassSelectors(value)
             elif key == "--id-selectors":
                 self.addIdSelectors(value)
+            elif key == "--lowercase-names":
+                self.lowercase_names = True
             elif key == "--compress-html":
                 self.compress_html = True
+            elif key == "--minify":
+                self.minify = True
             elif key == "--show-savings":
                 self.show_savings = True
+            elif key == "--compressors":
+                self.setCompressors(value)
+            elif key == "--compression-level":
+                self.setCompressionLevel(value)
+            elif key == "--savings-report":
+                self.savings_report = value
+            elif key == "--size-budget":
+                self.setSizeBudget(value)
+            elif key == "--precompress":
+                self.setPrecompress(value)
             elif key == "--verbose":
                 self.verbose = True
+            elif key == "--profile":
+                self.profile = True
+            elif key == "--profile-top":
+                self.setProfileTop(value)
+            elif key == "--profile-dump":
+                self.profile_dump = value
+            elif key == "--jobs":
+                self.setJobs(value)
+            elif key == "--stream":
+                self.stream = True
+            elif key == "--cache-dir":
+                self.cache_dir = value.rstrip("/")
+            elif key == "--cache-size":
+                self.setCacheSize(value)
+            elif key == "--document-cache-size":
+                self.setDocumentCacheSize(value)
+            elif key == "--gzip-names":
+                self.gzip_names = True
+            elif key == "--map-in":
+                self.map_in = value
+            elif key == "--map-out":
+                self.map_out = value
+            elif key == "--prune-unused":
+                self.prune_unused = True
+            elif key == "--safelist":
+                self.setSafelist(value)
+            elif key == "--map-export":
+                self.setMapExports(value)
+            elif key == "--map-compact":
+                self.setMapCompact(value)
+            elif key == "--watch":
+                self.watch = True
+            elif key == "--watch-interval":
+                self.setWatchInterval(value)
             elif key == "--js-manifest":
                 self.js_manifest = value
             elif key == "--rewrite-constants":
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import re
+from util import Util
+
+class CssMinifier(object):
+    """strips comments and whitespace from a stylesheet in a single pass
+
+    the stylesheet is tokenized so strings, url() values and escaped
+    characters are never touched.  comments are dropped, except for /*!
+    comments that are usually licenses.  every run of whitespace becomes
+    a single space or disappears next to punctuation where it can never
+    matter, and empty declarations and the last semicolon in a block are
+    dropped.  stylesheets read in pieces give exactly the same output as
+    reading them all at once.
+    """
+    # every token starts with one of the characters in the lookahead, which
+    # lets the search skip over everything else quickly
+    token_regex = re.compile(r'''(?=[/"'\\uU])(?:
+        (?P<comment>/\*.*?(?:\*/|\Z))
+        |(?P<string>"(?:[^"\\]|\\.?)*(?:"|\Z)|'(?:[^'\\]|\\.?)*(?:'|\Z))
+        |(?P<url>(?<![\w-])url\((?:[^)"'\\\s]|\\.?)*(?:\)|\Z))
+        |(?P<escape>\\.?)
+    )''', re.DOTALL | re.VERBOSE | re.IGNORECASE)
+
+    # characters that could be the start of a token continuing in the next chunk
+    partial_token_regex = re.compile(r'[\w/-]+\Z')
+
+    # empty declarations and the last semicolon in a block
+    semicolon_regex = re.compile(r';+(?=\})|;(?=;)')
+
+    # whitespace after one of these is never needed
+    space_after = "{};,>~:("
+
+    # whitespace before one of these is never needed
+    space_before = "{};,>~)!"
+
+    @staticmethod
+    def isJoined(last, first):
+        """checks if two characters would become part of the same token without anything in between
+
+        Arguments:
+        last -- last character written out
+        first -- first character after it
+
+        Returns:
+        bool
+
+        """
+        if not last:
+            return False
+
+        # 1px/**/2px is not the same as 1px2px and 1/**/.5 is not the same as 1.5
+        name = last.isalnum() or last in "_-\\" or last >= "\x80"
+        return name and (first.isalnum() or first in "_-\\" or first >= "\x80" or (first == "." and last.isdigit()))
+
+    @staticmethod
+    def minify(css):
+        """minifies a stylesheet
+
+        Arguments:
+        css -- css to minify
+
+        Returns:
+        string
+
+        """
+        return "".join(CssMinifier.minifyChunks([css]))
+
+    @staticmethod
+    def minifyChunks(chunks):
+        """minifies a stylesheet that is read in pieces
+
+        the css between two comments, strings or url() values is minified with
+        a few substitutions at once.  only the whitespace and semicolons at
+        either end of it have to wait for what comes next.
+
+        Arguments:
+        chunks -- iterable of consecutive pieces of the stylesheet
+
+        Returns:
+        generator -- minified pieces
+
+        """
+        search = CssMinifier.token_regex.search
+        carry = ""
+
+        # last character written out, a space and a semicolon that are only
+        # written out once it is known what comes after them, and whether a
+        # comment was dropped since then
+        last = ""
+        space = False
+        semicolon = False
+        comment = False
+
+        for chunk, final in Util.markLast(chunks):
+            css = carry + chunk
+            length = len(css)
+            result = []
+            position = 0
+            while True:
+                match = search(css, position)
+                start = match.start() if match is not None else length
+                end = match.end() if match is not None else length
+
+                if not final and end == length:
+                    # a token, a name or a / at the end could go on in the next piece
+                    partial = CssMinifier.partial_token_regex.search(css, position, start)
+                    start = partial.start() if partial is not None else start
+                    match = None
+
+                text = None
+                trailing = False
+                if start > position:
+                    code = css[position:start]
+                    if code[0] in " \t\n\r\f":
+                        space = True
+
+                    code = " ".join(code.split())
+                    for character in CssMinifier.space_after:
+                        code = code.replace(character + " ", character)
+                    for character in CssMinifier.space_before:
+                        code = code.replace(" " + character, character)
+                    code = CssMinifier.semicolon_regex.sub("", code)
+                    text = code.rstrip(";")
+                    trailing = len(text) < len(code)
+                    if semicolon:
+                        text = text.lstrip(";")
+                    position = start
+
+                if text:
+                    first = text[0]
+                    if semicolon:
+                        if first != "}":
+                            result.append(";")
+                            last = ";"
+                        semicolon = False
+
+                    if space:
+                        if last and last not in CssMinifier.space_after and first not in CssMinifier.space_before:
+                            result.append(" ")
+                        space = False
+                    elif comment and CssMinifier.isJoined(last, first):
+                        result.append(" ")
+                    comment = False
+
+                    result.append(text)
+                    last = text[-1]
+
+                if text is not None:
+                    # only the semicolons at the end are still pending, the
+                    # ones at the start were dropped in favor of the pending one
+                    if trailing:
+                        semicolon = True
+                    space = css[start - 1] in " \t\n\r\f"
+
+                if match is None:
+                    break
+
+                position = end
+                if match.lastgroup == "comment" and not css.startswith("/*!", start):
+                    comment = True
+                    continue
+
+                text = css[start:end]
+                if semicolon:
+                    result.append(";")
+                    last = ";"
+                    semicolon = False
+
+                if space:
+                    if last and last not in CssMinifier.space_after:
+                        result.append(" ")
+                    space = False
+                elif comment and CssMinifier.isJoined(last, text[0]):
+                    result.append(" ")
+                comment = False
+
+                result.append(text)
+                last = text[-1]
+
+            if final and semicolon:
+                result.append(";")
+
+            carry = css[position:]
+            yield "".join(result)
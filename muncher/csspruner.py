@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import re, fnmatch
+
+class CssPruner(object):
+    """drops css rules for classes and ids that nothing else uses
+
+    a selector is dropped when any class or id it needs is not used in the
+    markup or javascript, is not ignored and is not on the safelist.  a rule
+    is dropped once all of its selectors are, and an @media or @supports
+    block once all of its rules are.  names inside of :not() and other
+    functional pseudo classes never cause a drop, and @font-face, @keyframes
+    and other at-rules are always kept as they are.
+    """
+
+    # at-rules whose block contains more rules
+    rule_at_rules = ("media", "supports", "document", "-moz-document", "layer", "container", "scope")
+
+    token_regex = re.compile(r'''
+        (?P<comment>/\*.*?(?:\*/|\Z))
+        |(?P<string>"(?:[^"\\]|\\.?)*(?:"|\Z)|'(?:[^'\\]|\\.?)*(?:'|\Z))
+        |(?P<open>\{)
+        |(?P<close>\})
+        |(?P<end>;)
+    ''', re.DOTALL | re.VERBOSE)
+
+    selector_token_regex = re.compile(r'''
+        (?P<skip>\\.|"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|\[[^\]]*\])
+        |(?P<name>[.\#](?:[\w-]|\\.)+)
+        |(?P<open>\()
+        |(?P<close>\))
+        |(?P<comma>,)
+    ''', re.DOTALL | re.VERBOSE)
+
+    at_rule_regex = re.compile(r'\s*@([\w-]+)')
+    escape_regex = re.compile(r'\\(.)', re.DOTALL)
+
+    def __init__(self, used, ignore = (), safelist = ()):
+        """constructor
+
+        Arguments:
+        used -- set of classes and ids (with their . or # prefix) used in markup or javascript
+        ignore -- classes and ids that are never rewritten
+        safelist -- classes and ids to always keep, without a prefix to keep both
+        and with * or ? to keep every name that matches
+
+        Returns:
+        void
+
+        """
+        self.used = set(used)
+        self.used.update(ignore)
+        self.safelist = set()
+        self.patterns = []
+        for name in safelist:
+            names = [name] if name[0:1] in (".", "#") else ["." + name, "#" + name]
+            for name in names:
+                if "*" in name or "?" in name or "[" in name:
+                    self.patterns.append(name)
+                else:
+                    self.safelist.add(name)
+
+        # safelisted names that matched a pattern
+        self.matched = set()
+
+    def isUsed(self, name):
+        """checks if a class or id has to be kept
+
+        Arguments:
+        name -- class or id with prefix
+
+        Returns:
+        bool
+
+        """
+        return name in self.used or self.isSafelisted(name)
+
+    def isSafelisted(self, name):
+        """checks if a class or id is on the safelist
+
+        Arguments:
+        name -- class or id with prefix
+
+        Returns:
+        bool
+
+        """
+        if name in self.safelist or name in self.matched:
+            return True
+
+        for pattern in self.patterns:
+            if fnmatch.fnmatchcase(name, pattern):
+                self.matched.add(name)
+                return True
+
+        return False
+
+    def getSafelist(self, prefix):
+        """gets the safelisted classes or ids that are not patterns
+
+        Arguments:
+        prefix -- either "." for classes or "#" for ids
+
+        Returns:
+        list
+
+        """
+        return [name for name in self.safelist if name[0:1] == prefix]
+
+    def getPatterns(self, prefix):
+        """gets the safelist patterns for classes or ids
+
+        Arguments:
+        prefix -- either "." for classes or "#" for ids
+
+        Returns:
+        list
+
+        """
+        return [pattern for pattern in self.patterns if pattern[0:1] == prefix]
+
+    def prune(self, css):
+        """drops every rule that only applies to unused classes or ids
+
+        Arguments:
+        css -- contents of a stylesheet
+
+        Returns:
+        string
+
+        """
+        parts = []
+        position = 0
+        while True:
+            text, position = self.pruneRules(css, position)
+            parts.append(text)
+            if position >= len(css):
+                return "".join(parts)
+
+            # a stray closing brace
+            parts.append("}")
+            position += 1
+
+    def pruneRules(self, css, position):
+        """drops unused rules from a list of rules
+
+        Arguments:
+        css -- contents of a stylesheet
+        position -- where the list of rules starts
+
+        Returns:
+        tuple -- (pruned rules, position of the } that closes the list or the end of css)
+
+        """
+        parts = []
+        start = position
+        while True:
+            match = self.token_regex.search(css, position)
+            if match is None:
+                parts.append(css[start:])
+                return "".join(parts), len(css)
+
+            kind = match.lastgroup
+            position = match.end()
+
+            if kind == "comment" or kind == "string":
+                continue
+
+            if kind == "end":
+                parts.append(css[start:position])
+                start = position
+                continue
+
+            if kind == "close":
+                parts.append(css[start:match.start()])
+                return "".join(parts), match.start()
+
+            prelude = css[start:match.start()]
+            head, selectors = CssPruner.splitPrelude(prelude)
+            at_rule = self.at_rule_regex.match(selectors)
+
+            if at_rule is not None and at_rule.group(1).lower() in self.rule_at_rules:
+                rules, position = self.pruneRules(css, position)
+                position = min(position + 1, len(css))
+                if rules.strip():
+                    parts.append(prelude + "{" + rules + css[position - 1:position])
+                else:
+                    parts.append(head)
+                start = position
+                continue
+
+            position = CssPruner.skipBlock(css, position)
+            if at_rule is not None:
+                parts.append(css[start:position])
+            else:
+                kept = self.pruneSelectors(selectors)
+                if kept is None:
+                    parts.append(css[start:position])
+                elif kept:
+                    parts.append(head + kept + css[match.start():position])
+                else:
+                    parts.append(head)
+            start = position
+
+    @staticmethod
+    def splitPrelude(prelude):
+        """splits the text in front of a block into comments and the selectors
+
+        Arguments:
+        prelude -- everything between the end of the last rule and the {
+
+        Returns:
+        tuple -- (everything up to the end of the last comment, the rest)
+
+        """
+        end = prelude.rfind("*/")
+        if end == -1:
+            return "", prelude
+
+        return prelude[:end + 2], prelude[end + 2:]
+
+    @staticmethod
+    def skipBlock(css, position):
+        """finds the end of a block, skipping over any blocks inside of it
+
+        Arguments:
+        css -- contents of a stylesheet
+        position -- right after the { that opens the block
+
+        Returns:
+        int -- right after the } that closes the block or the end of css
+
+        """
+        depth = 1
+        while depth:
+            match = CssPruner.token_regex.search(css, position)
+            if match is None:
+                return len(css)
+
+            position = match.end()
+            if match.lastgroup == "open":
+                depth += 1
+            elif match.lastgroup == "close":
+                depth -= 1
+
+        return position
+
+    def pruneSelectors(self, selectors):
+        """drops the selectors in a selector list that need an unused class or id
+
+        Arguments:
+        selectors -- comma separated selectors
+
+        Returns:
+        string|None -- the selectors that are left or None if all of them are
+
+        """
+        kept = []
+        dropped = False
+        depth = 0
+        start = 0
+        used = True
+        for match in self.selector_token_regex.finditer(selectors):
+            kind = match.lastgroup
+            if kind == "name":
+                if depth == 0 and used:
+                    used = self.isUsed(self.escape_regex.sub(r'\1', match.group()))
+            elif kind == "open":
+                depth += 1
+            elif kind == "close":
+                depth = max(0, depth - 1)
+            elif kind == "comma" and depth == 0:
+                if used:
+                    kept.append(selectors[start:match.start()])
+                else:
+                    dropped = True
+                start = match.end()
+                used = True
+
+        if used:
+            kept.append(selectors[start:])
+        else:
+            dropped = True
+
+        if not dropped:
+            return None
+
+        if not kept:
+            return ""
+
+        # keep the space around the selectors even if the first or last one is dropped
+        return selectors[:len(selectors) - len(selectors.lstrip())] + ",".join(kept).strip() + selectors[len(selectors.rstrip()):]
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+from util import Util
+
+class CssRewriter(object):
+    """rewrites class and id selectors in a stylesheet in a single pass
+
+    the stylesheet is tokenized once and every .class or #id token that shows up
+    in a selector is looked up in the dictionary.  tokens inside of declaration
+    blocks, strings, comments and at-rule preludes are left alone so things like
+    colors (#fff) and file extensions (url(image.jpg)) never get rewritten.
+    """
+
+    # at-rules whose block contains declarations instead of more rules
+    declaration_at_rules = ("font-face", "page", "viewport", "-ms-viewport", "counter-style", "property", "font-feature-values")
+
+    # comments and strings also match when they are cut off by the end of the text
+    # so that a token running past the end of a chunk can be held back for the next one
+    token_regex = re.compile(r'''
+        (?P<comment>/\*.*?(?:\*/|\Z))
+        |(?P<string>"(?:[^"\\]|\\.?)*(?:"|\Z)|'(?:[^'\\]|\\.?)*(?:'|\Z))
+        |(?P<at>@[\w-]+)
+        |(?P<selector>[.\#](?:[\w-]|\\.?)+)
+        |(?P<open>\{)
+        |(?P<close>\})
+        |(?P<end>;)
+    ''', re.DOTALL | re.VERBOSE)
+
+    # characters that could be the start of a token continuing in the next chunk
+    partial_token_starts = "/.#@"
+
+    def __init__(self, dictionary):
+        """constructor
+
+        Arguments:
+        dictionary -- map of classes and ids (with their . or # prefix) to their new names
+
+        Returns:
+        void
+
+        """
+        self.dictionary = dictionary
+
+    def rewrite(self, css):
+        """rewrites all classes and ids found in selectors
+
+        Arguments:
+        css -- contents of css to rewrite
+
+        Returns:
+        string
+
+        """
+        return "".join(self.rewriteChunks([css]))
+
+    def rewriteChunks(self, chunks):
+        """rewrites a stylesheet that is read in pieces
+
+        tokens that might continue past the end of a chunk are carried over to
+        the next one so the output is the same as rewriting the whole thing at once
+
+        Arguments:
+        chunks -- iterable of consecutive pieces of the stylesheet
+
+        Returns:
+        generator -- rewritten pieces
+
+        """
+        dictionary = self.dictionary
+        carry = ""
+
+        # each entry is True if the block contains declarations, False if it contains rules
+        blocks = []
+        in_declarations = False
+        at_rule = None
+
+        for chunk, final in Util.markLast(chunks):
+            css = carry + chunk
+            length = len(css)
+            stop = length
+            result = []
+            last = 0
+
+            for match in self.token_regex.finditer(css):
+                if not final and match.end() == length:
+                    stop = match.start()
+                    break
+
+                kind = match.lastgroup
+
+                if kind == "selector":
+                    if in_declarations or at_rule is not None:
+                        continue
+
+                    token = match.group()
+                    if token in dictionary:
+                        result.append(css[last:match.start()])
+                        result.append(dictionary[token])
+                        last = match.end()
+                    continue
+
+                if kind == "at":
+                    if not in_declarations:
+                        at_rule = match.group()[1:].lower()
+                    continue
+
+                if kind == "open":
+                    if in_declarations:
+                        blocks.append(True)
+                    elif at_rule is not None:
+                        in_declarations = at_rule in self.declaration_at_rules
+                        blocks.append(in_declarations)
+                    else:
+                        in_declarations = True
+                        blocks.append(True)
+                    at_rule = None
+                    continue
+
+                if kind == "close":
+                    if blocks:
+                        blocks.pop()
+                    in_declarations = blocks[-1] if blocks else False
+                    at_rule = None
+                    continue
+
+                if kind == "end" and not in_declarations:
+                    at_rule = None
+            else:
+                if not final and length and css[-1] in self.partial_token_starts:
+                    stop = length - 1
+
+            result.append(css[last:stop])
+            carry = css[stop:]
+            yield "".join(result)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from collections import OrderedDict
+from util import Util
+
+class DocumentStore(object):
+    """keeps files that were read while searching so they can be rewritten without reading them again
+
+    views also keep the markup, style and script segments they were split into.
+    once the documents kept add up to more than max_size bytes the least
+    recently used ones are dropped and simply read from disk again when they
+    are needed.
+    """
+    def __init__(self, max_size):
+        """constructor
+
+        Arguments:
+        max_size -- maximum number of bytes of documents to keep in memory
+
+        Returns:
+        void
+
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.documents = OrderedDict()
+        self.reads = 0
+
+    def getContents(self, path):
+        """gets the contents of a file, reading it from disk only if it is not kept
+
+        Arguments:
+        path -- path to file
+
+        Returns:
+        string
+
+        """
+        document = self.get(path)
+        if document is not None:
+            return document[0]
+
+        contents = Util.fileGetContents(path)
+        self.reads += 1
+        self.add(path, [contents, None])
+        return contents
+
+    def getSegments(self, path, contents, segmenter):
+        """gets the segments a view was split into
+
+        Arguments:
+        path -- path to view
+        contents -- contents of the view
+        segmenter -- function that splits contents into segments
+
+        Returns:
+        list
+
+        """
+        document = self.get(path)
+        if document is not None and document[1] is not None:
+            return document[1]
+
+        segments = segmenter(contents)
+        if document is not None:
+            # the segments take up about as much memory as the contents
+            self.remove(path)
+            self.add(path, [contents, segments])
+
+        return segments
+
+    def get(self, path):
+        """gets a kept document and marks it as recently used
+
+        Arguments:
+        path -- path to file
+
+        Returns:
+        list|None -- [contents, segments]
+
+        """
+        document = self.documents.pop(path, None)
+        if document is not None:
+            self.documents[path] = document
+
+        return document
+
+    def add(self, path, document):
+        """keeps a document if it fits, dropping the least recently used ones to make room
+
+        Arguments:
+        path -- path to file
+        document -- [contents, segments]
+
+        Returns:
+        void
+
+        """
+        size = DocumentStore.getSize(document)
+        if size > self.max_size:
+            return
+
+        while self.size + size > self.max_size:
+            old_path, old_document = self.documents.popitem(False)
+            self.size -= DocumentStore.getSize(old_document)
+
+        self.documents[path] = document
+        self.size += size
+
+    def remove(self, path):
+        """stops keeping a document, for example because it changed on disk or is done
+
+        Arguments:
+        path -- path to file
+
+        Returns:
+        void
+
+        """
+        document = self.documents.pop(path, None)
+        if document is not None:
+            self.size -= DocumentStore.getSize(document)
+
+    def clear(self):
+        """stops keeping any documents
+
+        Returns:
+        void
+
+        """
+        self.documents.clear()
+        self.size = 0
+
+    @staticmethod
+    def getSize(document):
+        """gets roughly how many bytes a document takes up
+
+        Arguments:
+        document -- [contents, segments]
+
+        Returns:
+        int
+
+        """
+        size = len(document[0])
+        if document[1] is not None:
+            size *= 2
+
+        return size
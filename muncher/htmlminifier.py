@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import re
+from htmlsegmenter import HtmlSegmenter
+
+class HtmlMinifier(object):
+    """minifies html in a single pass over its segments
+
+    runs of whitespace in text are collapsed to a single space the same way
+    browsers collapse them, and left out entirely next to block level tags
+    where they are never rendered.  whitespace inside of tags is collapsed
+    outside of quoted attribute values.  comments are dropped, except for
+    conditional comments.  the contents of pre, textarea, script and style
+    elements are left exactly as they are.
+    """
+    whitespace_regex = re.compile(r'[ \t\n\r\f]+')
+    tag_regex = re.compile(r'''"[^"]*"|'[^']*'|[ \t\n\r\f]+''')
+    # tags without any of these are already as short as they get
+    tag_whitespace_regex = re.compile(r'[\t\n\r\f]|  | >')
+    tag_name_regex = re.compile(r'</?([a-zA-Z][^\s/>]*)')
+    conditional_comment_regex = re.compile(r'<!--\s*(?:\[if\s|<!)', re.IGNORECASE)
+
+    # elements whose text has to stay exactly as it is
+    preserve_tags = frozenset(["pre", "textarea"])
+
+    # whitespace right inside or outside of these tags is never rendered
+    block_tags = frozenset(["html", "head", "body", "title", "meta", "link", "base",
+        "address", "article", "aside", "blockquote", "br", "caption", "col", "colgroup", "dd", "details",
+        "dialog", "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2",
+        "h3", "h4", "h5", "h6", "header", "hgroup", "hr", "li", "main", "menu", "nav", "ol", "optgroup",
+        "option", "p", "section", "summary", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul"])
+
+    @staticmethod
+    def minify(html):
+        """minifies a document or a piece of one
+
+        Arguments:
+        html -- html to minify
+
+        Returns:
+        string
+
+        """
+        parts = []
+        text = []
+        preserve = 0
+
+        # nothing in the head is rendered as text
+        in_head = False
+
+        # whether the last tag written out was a block level tag
+        after_block = False
+
+        for type, start, end in HtmlSegmenter.split(html):
+            if type == "text":
+                if preserve:
+                    parts.append(html[start:end])
+                else:
+                    text.append(html[start:end])
+                continue
+
+            if type == "comment":
+                segment = html[start:end]
+                if segment.startswith("<!--") and HtmlMinifier.conditional_comment_regex.match(segment) is None:
+                    # the text on both sides of a comment is collapsed together
+                    continue
+
+                if text:
+                    parts.append(HtmlMinifier.collapseText("".join(text), after_block or in_head, in_head))
+                    text = []
+                parts.append(segment)
+                after_block = False
+                continue
+
+            if type != "tag":
+                # contents of a style or script block
+                parts.append(html[start:end])
+                continue
+
+            tag = html[start:end]
+            match = HtmlMinifier.tag_name_regex.match(tag)
+            name = match.group(1).lower() if match is not None else ""
+            is_block = name in HtmlMinifier.block_tags or in_head
+
+            if text:
+                parts.append(HtmlMinifier.collapseText("".join(text), after_block or in_head, is_block))
+                text = []
+
+            if name == "head":
+                in_head = tag[1] != "/"
+            elif name == "body":
+                in_head = False
+
+            parts.append(HtmlMinifier.collapseTag(tag))
+            after_block = is_block
+
+            if name in HtmlMinifier.preserve_tags:
+                if tag[1] == "/":
+                    preserve = max(0, preserve - 1)
+                elif not tag.endswith("/>"):
+                    preserve += 1
+
+        if text:
+            parts.append(HtmlMinifier.collapseText("".join(text), after_block, False))
+
+        return "".join(parts)
+
+    @staticmethod
+    def collapseText(text, after_block, before_block):
+        """collapses the whitespace in a run of text
+
+        Arguments:
+        text -- text between two tags
+        after_block -- whether the text comes right after a block level tag
+        before_block -- whether the text comes right before a block level tag
+
+        Returns:
+        string
+
+        """
+        text = HtmlMinifier.whitespace_regex.sub(" ", text)
+        if after_block:
+            text = text.lstrip(" ")
+        if before_block:
+            text = text.rstrip(" ")
+        return text
+
+    @staticmethod
+    def collapseTag(tag):
+        """collapses the whitespace between the attributes of a tag
+
+        Arguments:
+        tag -- a whole tag from < to >
+
+        Returns:
+        string
+
+        """
+        if HtmlMinifier.tag_whitespace_regex.search(tag) is None:
+            return tag
+
+        tag = HtmlMinifier.tag_regex.sub(HtmlMinifier.replaceTagToken, tag)
+        if tag.endswith(" >"):
+            tag = tag[:-2] + ">"
+        return tag
+
+    @staticmethod
+    def replaceTagToken(match):
+        """callback that keeps quoted values and turns whitespace into a single space
+
+        Arguments:
+        match -- match object for a quoted value or whitespace
+
+        Returns:
+        string
+
+        """
+        token = match.group()
+        if token[0] == '"' or token[0] == "'":
+            return token
+        return " "
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+from lrucache import LruCache
+
+class HtmlRewriter(object):
+    """rewrites class and id attributes in html markup in a single pass
+
+    every class="" and id="" attribute is found with one scan of the document
+    and its value is rewritten by looking each name up in the maps.  attribute
+    values repeat a lot across templates so rewritten values are cached.
+    """
+    attribute_regex = re.compile(r'''(?<![\w-])(class|id)(\s*=\s*)(?:"([^"]*)"|'([^']*)')''', re.IGNORECASE)
+    name_regex = re.compile(r'\S+')
+
+    def __init__(self, class_map, id_map, cache_size = 4096):
+        """constructor
+
+        Arguments:
+        class_map -- map of classes (with . prefix) to their new names
+        id_map -- map of ids (with # prefix) to their new names
+        cache_size -- how many rewritten attribute values to remember
+
+        Returns:
+        void
+
+        """
+        self.class_map = class_map
+        self.id_map = id_map
+        self.cache = LruCache(cache_size)
+
+    def rewrite(self, html):
+        """rewrites all class and id attributes in a block of html
+
+        Arguments:
+        html -- contents to rewrite
+
+        Returns:
+        string
+
+        """
+        return self.attribute_regex.sub(self.replaceAttribute, html)
+
+    def getNames(self, html):
+        """gets every class and id used in class and id attributes
+
+        Arguments:
+        html -- contents to search
+
+        Returns:
+        set -- classes with a . prefix and ids with a # prefix
+
+        """
+        names = set()
+        for match in self.attribute_regex.finditer(html):
+            value = match.group(3) if match.group(3) is not None else match.group(4)
+            if match.group(1).lower() == "id":
+                names.add("#" + value)
+                continue
+
+            for class_name in value.split():
+                names.add("." + class_name)
+
+        return names
+
+    def replaceAttribute(self, match):
+        """callback for rewriting a single class or id attribute
+
+        Arguments:
+        match -- match object for the attribute
+
+        Returns:
+        string
+
+        """
+        attribute = match.group(1)
+        if match.group(3) is not None:
+            quote = '"'
+            value = match.group(3)
+        else:
+            quote = "'"
+            value = match.group(4)
+
+        return attribute + match.group(2) + quote + self.rewriteValue(attribute.lower(), value) + quote
+
+    def rewriteValue(self, attribute, value):
+        """rewrites the value of a class or id attribute
+
+        Arguments:
+        attribute -- either "class" or "id"
+        value -- contents of the attribute
+
+        Returns:
+        string
+
+        """
+        key = (attribute, value)
+        new_value = self.cache.get(key)
+        if new_value is not None:
+            return new_value
+
+        if attribute == "id":
+            new_value = self.id_map.get("#" + value)
+            new_value = value if new_value is None else new_value[1:]
+        else:
+            new_value = self.name_regex.sub(self.replaceClass, value)
+
+        self.cache.set(key, new_value)
+        return new_value
+
+    def replaceClass(self, match):
+        """callback for rewriting a single class name within a class attribute
+
+        Arguments:
+        match -- match object for the class name
+
+        Returns:
+        string
+
+        """
+        new_name = self.class_map.get("." + match.group())
+        if new_name is None:
+            return match.group()
+
+        return new_name[1:]
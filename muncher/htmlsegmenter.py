@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import re
+
+class HtmlSegmenter(object):
+    """splits html into segments in a single pass
+
+    a document is cut into text, comments, tags (with all of their attributes)
+    and the contents of style and script blocks, with the exact offsets of
+    each one.  quoted attribute values may contain > and a block only ends at
+    its own closing tag, the same way browsers read it, so every character is
+    looked at a constant number of times no matter how big the page is.
+    """
+    # comments, doctypes and tags.  a tag runs until the first > that is not
+    # inside of a quoted attribute value
+    token_regex = re.compile(r'''<!--.*?(?:-->|\Z)|<[!?][^>]*(?:>|\Z)|<(/?)([a-zA-Z][^\s/>]*)(?:[^>"']|"[^"]*(?:"|\Z)|'[^']*(?:'|\Z))*(?:>|\Z)''', re.DOTALL)
+
+    # comments and the opening tags of style and script blocks
+    block_regex = re.compile(r'''<!--.*?(?:-->|\Z)|<(style|script)(?=[\s/>]|\Z)(?:[^>"']|"[^"]*(?:"|\Z)|'[^']*(?:'|\Z))*(?:>|\Z)''', re.DOTALL | re.IGNORECASE)
+
+    # elements whose contents are not markup
+    block_types = {"style": "style", "script": "script"}
+
+    @staticmethod
+    def split(html):
+        """splits html into segments
+
+        Arguments:
+        html -- contents of a view
+
+        Returns:
+        list -- tuples of (type, start, end) where type is "text", "comment", "tag", "style" or "script"
+
+        """
+        segments = []
+        append = segments.append
+        search = HtmlSegmenter.token_regex.search
+        block_types = HtmlSegmenter.block_types
+        lower = None
+        position = 0
+        length = len(html)
+        while position < length:
+            match = search(html, position)
+            if match is None:
+                append(("text", position, length))
+                break
+
+            start, end = match.span()
+            if start > position:
+                append(("text", position, start))
+
+            name = match.group(2)
+            if name is None:
+                append(("comment", start, end))
+                position = end
+                continue
+
+            append(("tag", start, end))
+            position = end
+
+            name = name.lower()
+            if match.group(1) or name not in block_types:
+                continue
+
+            if lower is None:
+                lower = html.lower()
+
+            close = HtmlSegmenter.findClosingTag(lower, name, end)
+            append((block_types[name], end, close))
+            position = close
+
+        return segments
+
+    @staticmethod
+    def splitBlocks(html):
+        """splits html into markup, style blocks and script blocks
+
+        this only stops at comments and style and script tags so it is a lot
+        faster than split() when the tags in between do not matter
+
+        Arguments:
+        html -- contents of a view
+
+        Returns:
+        list -- tuples of (type, start, end) where type is "markup", "style" or "script"
+
+        """
+        segments = []
+        search = HtmlSegmenter.block_regex.search
+        lower = None
+        markup_start = 0
+        position = 0
+        length = len(html)
+        while position < length:
+            match = search(html, position)
+            if match is None:
+                break
+
+            position = match.end()
+            name = match.group(1)
+            if name is None:
+                continue
+
+            if lower is None:
+                lower = html.lower()
+
+            name = name.lower()
+            close = HtmlSegmenter.findClosingTag(lower, name, position)
+            segments.append(("markup", markup_start, position))
+            segments.append((HtmlSegmenter.block_types[name], position, close))
+            markup_start = close
+            position = close
+
+        if markup_start < length:
+            segments.append(("markup", markup_start, length))
+
+        return segments
+
+    @staticmethod
+    def findClosingTag(lower, name, position):
+        """finds where a style or script block ends
+
+        Arguments:
+        lower -- lowercase contents of the view
+        name -- lowercase name of the element
+        position -- where the contents of the element start
+
+        Returns:
+        int -- offset of the closing tag or the end of the document
+
+        """
+        closing = "</" + name
+        while True:
+            position = lower.find(closing, position)
+            if position == -1:
+                return len(lower)
+
+            after = lower[position + len(closing):position + len(closing) + 1]
+            if after == "" or after in " \t\n\r\f/>":
+                return position
+
+            position += len(closing)
+
+    @staticmethod
+    def getSegments(html, tags = False):
+        """splits html into segments and gets the text of each one
+
+        Arguments:
+        html -- contents of a view
+        tags -- split the markup into text, comments and tags as well
+
+        Returns:
+        list -- tuples of (type, text)
+
+        """
+        segments = HtmlSegmenter.split(html) if tags else HtmlSegmenter.splitBlocks(html)
+        return [(type, html[start:end]) for type, start, end in segments]
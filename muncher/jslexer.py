@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import re
+from util import Util
+
+class JsLexer(object):
+    """finds the string literals passed to js selector calls in a single pass
+
+    javascript is scanned from one string, template, comment, regex literal,
+    parenthesis or brace to the next, keeping track of which calls and blocks
+    are open, so a string literal is only reported when it is passed straight
+    to a selector call and never when it is inside of a comment, another
+    string or a function body.  the open calls are carried over when
+    javascript is read in pieces.
+    """
+    token_regex = re.compile(r'''["'`/(){}]''')
+    string_regex = re.compile(r'''"(?:[^"\\\n]|\\.?)*(?:"|(?=\n)|\Z)|'(?:[^'\\\n]|\\.?)*(?:'|(?=\n)|\Z)|`(?:[^`\\]|\\.?)*(?:`|\Z)''', re.DOTALL)
+    comment_regex = re.compile(r'//[^\n]*|/\*.*?(?:\*/|\Z)', re.DOTALL)
+    regex_literal_regex = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[\w$]*')
+    word_regex = re.compile(r'[\w$]+\Z')
+
+    # a / after one of these starts a regex literal instead of being a division
+    regex_keywords = frozenset(["return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else", "yield", "await"])
+
+    def __init__(self, selectors):
+        """constructor
+
+        Arguments:
+        selectors -- names of the selector functions, such as document.querySelector or addClass
+
+        Returns:
+        void
+
+        """
+        self.selectors = frozenset(selectors)
+        self.lengths = sorted(set(len(selector) for selector in self.selectors), reverse = True)
+
+    def getSelector(self, js, start, position):
+        """gets which selector is called by the parenthesis at start, if any
+
+        the selector has to come right after a dot or at the start of a name so
+        foo.addClass and $.qs are calls to addClass and qs but foo$ is not a call to $
+
+        Arguments:
+        js -- javascript being read
+        start -- position of the opening parenthesis
+        position -- end of the token before it
+
+        Returns:
+        string|None
+
+        """
+        for length in self.lengths:
+            if start - length < position:
+                continue
+
+            name = js[start - length:start]
+            if name not in self.selectors:
+                continue
+
+            before = js[start - length - 1] if start - length > 0 else ""
+            if not (before.isalnum() or before == "_" or before == "$"):
+                return name
+
+        return None
+
+    @staticmethod
+    def isRegexAllowed(code, regex_allowed):
+        """checks if a / right after a run of code would begin a regex literal
+
+        Arguments:
+        code -- code between the last token and the /
+        regex_allowed -- whether a / was allowed right after the last token
+
+        Returns:
+        bool
+
+        """
+        code = code.rstrip()
+        if not code:
+            return regex_allowed
+
+        last = code[-1]
+        if last == "]":
+            return False
+
+        if last.isalnum() or last == "_" or last == "$":
+            word = JsLexer.word_regex.search(code[-11:])
+            return word is not None and word.group() in JsLexer.regex_keywords
+
+        return True
+
+    def lex(self, js, final = True, state = None):
+        """finds every string literal passed to a selector call
+
+        when more javascript is coming, lexing stops in front of a token or a
+        name that could go on in the next piece
+
+        Arguments:
+        js -- javascript to read
+        final -- whether this is the end of the javascript
+        state -- state returned for the piece of javascript before this one
+
+        Returns:
+        tuple -- (arguments, end, state) where arguments is a list of
+        (selector, start, end, first) tuples for every string literal, first is
+        True for the first string literal passed to that call, everything
+        before end was read and state is what to pass in with the rest
+
+        """
+        search = JsLexer.token_regex.search
+        calls, regex_allowed = state if state is not None else ([], True)
+        arguments = []
+        length = len(js)
+
+        # end of the last token
+        position = 0
+        while True:
+            match = search(js, position)
+            if match is None:
+                break
+
+            start = match.start()
+            end = start + 1
+            token = js[start]
+
+            if token == "(":
+                selector = self.getSelector(js, start, position) if start > position else None
+                calls.append([selector, False] if selector is not None else None)
+                regex_allowed = True
+            elif token == "{":
+                calls.append(None)
+                regex_allowed = True
+            elif token == ")" or token == "}":
+                if calls:
+                    calls.pop()
+                regex_allowed = token == "}"
+            elif token != "/":
+                end = JsLexer.string_regex.match(js, start).end()
+                if not final and end == length:
+                    return arguments, start, (calls, JsLexer.isRegexAllowed(js[position:start], regex_allowed))
+
+                call = calls[-1] if calls else None
+                # an unterminated string or a template with substitutions is left alone
+                if call is not None and end - start > 1 and js[end - 1] == token and (token != "`" or js.find("${", start, end) == -1):
+                    arguments.append((call[0], start, end, not call[1]))
+                    call[1] = True
+                regex_allowed = False
+            else:
+                regex_allowed = JsLexer.isRegexAllowed(js[position:start], regex_allowed)
+                if not final and end == length:
+                    return arguments, start, (calls, regex_allowed)
+
+                literal = JsLexer.comment_regex.match(js, start)
+                if literal is None and regex_allowed:
+                    literal = JsLexer.regex_literal_regex.match(js, start)
+                    if literal is None and not final and js.find("\n", start) == -1:
+                        # the rest of the regex literal might be in the next piece
+                        return arguments, start, (calls, regex_allowed)
+
+                if literal is None:
+                    # a division
+                    regex_allowed = True
+                else:
+                    end = literal.end()
+                    if not final and end == length:
+                        return arguments, start, (calls, regex_allowed)
+
+                    # a comment leaves regex_allowed as it was
+                    if js[start + 1] != "/" and js[start + 1] != "*":
+                        regex_allowed = False
+
+            position = end
+
+        end = length
+        if not final:
+            # a name at the end might be the start of a selector call
+            while end > position and (js[end - 1].isalnum() or js[end - 1] in "_$."):
+                end -= 1
+
+        return arguments, end, (calls, JsLexer.isRegexAllowed(js[position:end], regex_allowed))
+
+    def lexChunks(self, chunks):
+        """finds the string literals passed to selector calls in javascript that is read in pieces
+
+        Arguments:
+        chunks -- iterable of consecutive pieces of javascript
+
+        Returns:
+        generator -- tuples of (javascript, arguments) with offsets relative to each piece of javascript
+
+        """
+        carry = ""
+        state = None
+        for chunk, last in Util.markLast(chunks):
+            js = carry + chunk
+            arguments, end, state = self.lex(js, last, state)
+            carry = js[end:]
+            yield js[:end], arguments
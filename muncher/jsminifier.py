@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import re
+from util import Util
+from jslexer import JsLexer
+
+class JsMinifier(object):
+    """strips comments and whitespace from javascript in a single pass
+
+    strings and regex literals are found with the same rules as JsLexer and
+    template literals are followed through their substitutions, so none of
+    them are ever touched.  comments are dropped, except for /*! comments
+    that are usually licenses.  a run of whitespace is only kept where
+    leaving it out would join two tokens together, and a line break is only
+    kept where automatic semicolon insertion could depend on it.  javascript
+    read in pieces gives exactly the same output as reading it all at once.
+    """
+    token_regex = re.compile(r'''["'`/]|<!--''')
+
+    # the parts of a template literal and of the code in its substitutions that matter for finding where they end
+    template_regex = re.compile(r'\\.?|`|\$\{', re.DOTALL)
+    substitution_regex = re.compile(r'''["'`{}/]''')
+
+    # characters that could be the start of a token continuing in the next chunk
+    partial_token_regex = re.compile(r'(?:[\w$\\<!-]|[^\x00-\x7f])+\Z')
+
+    # a line break is kept between a character from the first set and one from the second
+    newline_before = "}])+-\"'`"
+    newline_after = "{[(+-!~\"'`/#"
+
+    # pairs of characters that would become a different token without a space between them
+    joined_tokens = frozenset(["++", "--", "//", "/*", "<!", "->"])
+
+    # the same rules as getSeparator for the whitespace in between two tokens
+    name_class = r'\w$\\\x80-\xff'
+    newline_regex = re.compile(r'\n(?:(?<![' + name_class + re.escape(newline_before) + r']\n)|(?![' + name_class + re.escape(newline_after) + r']))')
+    space_regex = re.compile(r' (?!(?<=[' + name_class + r'] )[' + name_class + r'])(?!(?<=\d )\.)(?!(?<=\+ )\+)(?!(?<=- )[->])(?!(?<=/ )[/*])(?!(?<=< )!)')
+    blank_lines_regex = re.compile(r'\n\n+')
+    spaces_regex = re.compile(r'  +')
+
+    @staticmethod
+    def isNameCharacter(character):
+        """checks if a character can be part of a name, keyword or number
+
+        Arguments:
+        character -- single character
+
+        Returns:
+        bool
+
+        """
+        return character.isalnum() or character == "_" or character == "$" or character == "\\" or character >= "\x80"
+
+    @staticmethod
+    def getSeparator(last, first, newline):
+        """gets what has to stay of the whitespace between two tokens
+
+        Arguments:
+        last -- last character before the whitespace
+        first -- first character after it
+        newline -- whether the whitespace contains a line break
+
+        Returns:
+        string
+
+        """
+        last_name = JsMinifier.isNameCharacter(last)
+        first_name = JsMinifier.isNameCharacter(first)
+        if newline and (last_name or last in JsMinifier.newline_before) and (first_name or first in JsMinifier.newline_after):
+            return "\n"
+
+        if last_name and first_name:
+            return " "
+
+        # 1 .toString() is not the same as 1.toString()
+        if last.isdigit() and first == ".":
+            return " "
+
+        if last + first in JsMinifier.joined_tokens:
+            return " "
+
+        return ""
+
+    @staticmethod
+    def minifyCode(code):
+        """minifies the whitespace in code that has no strings, comments or regex literals in it
+
+        Arguments:
+        code -- code that does not start or end with whitespace
+
+        Returns:
+        string
+
+        """
+        if code.find("\n") != -1:
+            code = JsMinifier.blank_lines_regex.sub("\n", "\n".join([line.strip() for line in code.split("\n")]))
+            code = JsMinifier.newline_regex.sub(" ", code)
+
+        code = JsMinifier.spaces_regex.sub(" ", code.replace("\t", " ").replace("\v", " ").replace("\f", " "))
+        return JsMinifier.space_regex.sub("", code)
+
+    @staticmethod
+    def getTemplateEnd(js, start):
+        """finds where a template literal ends, skipping over the templates nested in its substitutions
+
+        Arguments:
+        js -- javascript being read
+        start -- position of the opening backtick
+
+        Returns:
+        int -- position right after the closing backtick, or the end of the javascript if it is not closed
+
+        """
+        position = start + 1
+        while True:
+            match = JsMinifier.template_regex.search(js, position)
+            if match is None:
+                return len(js)
+
+            token = match.group()
+            if token == "`":
+                return match.end()
+
+            position = JsMinifier.getSubstitutionEnd(js, match.end()) if token == "${" else match.end()
+
+    @staticmethod
+    def getSubstitutionEnd(js, position):
+        """finds where a ${} substitution in a template literal ends
+
+        Arguments:
+        js -- javascript being read
+        position -- position right after the ${
+
+        Returns:
+        int -- position right after the closing brace, or the end of the javascript if it is not closed
+
+        """
+        depth = 0
+        regex_allowed = True
+        while True:
+            match = JsMinifier.substitution_regex.search(js, position)
+            if match is None:
+                return len(js)
+
+            start = match.start()
+            first = js[start]
+            if start > position:
+                code = js[position:start].rstrip()
+                if code:
+                    regex_allowed = code[-1] != ")" and JsLexer.isRegexAllowed(code, regex_allowed)
+
+            if first == "/":
+                literal = JsLexer.comment_regex.match(js, start)
+                if literal is None and regex_allowed:
+                    literal = JsLexer.regex_literal_regex.match(js, start)
+
+                if literal is None:
+                    # a division
+                    position = start + 1
+                    regex_allowed = True
+                    continue
+
+                position = literal.end()
+                if js[start + 1] != "/" and js[start + 1] != "*":
+                    regex_allowed = False
+            elif first == "`":
+                position = JsMinifier.getTemplateEnd(js, start)
+                regex_allowed = False
+            elif first == '"' or first == "'":
+                position = JsLexer.string_regex.match(js, start).end()
+                regex_allowed = False
+            elif first == "}" and depth == 0:
+                return start + 1
+            else:
+                depth += 1 if first == "{" else -1
+                position = start + 1
+                regex_allowed = True
+
+    @staticmethod
+    def minify(js):
+        """minifies javascript
+
+        Arguments:
+        js -- javascript to minify
+
+        Returns:
+        string
+
+        """
+        return "".join(JsMinifier.minifyChunks([js]))
+
+    @staticmethod
+    def minifyChunks(chunks):
+        """minifies javascript that is read in pieces
+
+        Arguments:
+        chunks -- iterable of consecutive pieces of javascript
+
+        Returns:
+        generator -- minified pieces
+
+        """
+        search = JsMinifier.token_regex.search
+        carry = ""
+        regex_allowed = True
+
+        # last character written out and the whitespace that is only written
+        # out once it is known what comes after it
+        last = ""
+        space = None
+
+        for chunk, final in Util.markLast(chunks):
+            js = carry + chunk
+            length = len(js)
+            result = []
+            position = 0
+            while True:
+                match = search(js, position)
+                start = match.start() if match is not None else length
+
+                if start > position:
+                    code = js[position:start]
+                    if not final and start == length:
+                        # a name at the end might go on in the next piece
+                        partial = JsMinifier.partial_token_regex.search(js, position, start)
+                        if partial is not None:
+                            code = js[position:partial.start()]
+                            match = None
+
+                    stripped = code.strip()
+                    leading = len(code) - len(code.lstrip())
+                    if leading:
+                        space = "\n" if space == "\n" or code.find("\n", 0, leading) != -1 else " "
+
+                    if stripped:
+                        if space is not None and last:
+                            result.append(JsMinifier.getSeparator(last, stripped[0], space == "\n"))
+
+                        text = JsMinifier.minifyCode(stripped)
+                        result.append(text)
+                        last = text[-1]
+
+                        # a / right after a closing parenthesis is taken as a division, the same as in JsLexer
+                        regex_allowed = stripped[-1] != ")" and JsLexer.isRegexAllowed(stripped, regex_allowed)
+
+                        space = None
+                        trailing = len(code.rstrip())
+                        if trailing < len(code):
+                            space = "\n" if code.find("\n", trailing) != -1 else " "
+
+                    position += len(code)
+
+                if match is None:
+                    break
+
+                token = match.group()
+                end = match.end()
+                first = token[0]
+                literal = None
+                if first == "/":
+                    literal = JsLexer.comment_regex.match(js, start)
+                    if literal is None and regex_allowed:
+                        literal = JsLexer.regex_literal_regex.match(js, start)
+                        if literal is None and not final and js.find("\n", start) == -1:
+                            # the rest of the regex literal might be in the next piece
+                            break
+
+                    if literal is not None:
+                        end = literal.end()
+                elif first == "<":
+                    # <!-- starts a comment that runs to the end of the line
+                    end = js.find("\n", start)
+                    end = end if end != -1 else length
+                elif first == "`":
+                    end = JsMinifier.getTemplateEnd(js, start)
+                else:
+                    end = JsLexer.string_regex.match(js, start).end()
+
+                # everything that touches the end could go on in the next piece
+                if not final and end == length:
+                    break
+
+                position = end
+                text = js[start:end]
+                after_regex = False
+                if first == "/" and literal is None:
+                    # a division
+                    regex_allowed = True
+                elif first == "/" and text[1] != "/" and text[1] != "*":
+                    regex_allowed = False
+                    after_regex = True
+                elif first != "/" and first != "<":
+                    regex_allowed = False
+                elif not text.startswith("/*!"):
+                    # a comment is only written out as whatever has to stay
+                    # between the tokens around it
+                    if first == "<" or text[1] == "/" or text.find("\n") != -1:
+                        space = "\n"
+                    elif space is None:
+                        space = " "
+                    continue
+
+                if space is not None:
+                    if last:
+                        result.append(JsMinifier.getSeparator(last, first, space == "\n"))
+                    space = None
+
+                result.append(text)
+                last = text[-1]
+
+                # flags could follow a regex literal so it has to end like a name does
+                if after_regex and last == "/":
+                    last = "a"
+
+            carry = js[position:]
+            yield "".join(result)
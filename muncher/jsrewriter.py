@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+
+class JsRewriter(object):
+    """rewrites the string arguments of js selector calls in a single pass
+
+    JsLexer finds the string literals passed to every selector call and each
+    one is looked up in the maps.  custom selectors such as $ or querySelector take
+    css selectors so every .class and #id inside of the string is rewritten,
+    other selectors take a bare class name or id.
+    """
+    selector_regex = re.compile(r'[.#][\w-]+')
+
+    def __init__(self, config, class_map, id_map):
+        """constructor
+
+        Arguments:
+        config -- Config object with the js selectors to look for
+        class_map -- map of classes (with . prefix) to their new names
+        id_map -- map of ids (with # prefix) to their new names
+
+        Returns:
+        void
+
+        """
+        self.config = config
+        self.class_map = class_map
+        self.id_map = id_map
+
+    def rewrite(self, js):
+        """rewrites all selector calls in a block of javascript
+
+        Arguments:
+        js -- contents of javascript to rewrite
+
+        Returns:
+        string
+
+        """
+        arguments = self.config.getJsLexer().lex(js)[0]
+        return self.rewriteArguments(js, arguments)
+
+    def rewriteChunks(self, chunks):
+        """rewrites javascript that is read in pieces
+
+        the lexer carries tokens and selector calls that are not finished yet
+        over to the next chunk so every piece can be rewritten on its own
+
+        Arguments:
+        chunks -- iterable of consecutive pieces of javascript
+
+        Returns:
+        generator -- rewritten pieces
+
+        """
+        for js, arguments in self.config.getJsLexer().lexChunks(chunks):
+            yield self.rewriteArguments(js, arguments)
+
+    def rewriteArguments(self, js, arguments):
+        """rewrites the string literals passed to selector calls
+
+        Arguments:
+        js -- javascript the arguments were found in
+        arguments -- list of (selector, start, end, first) tuples from JsLexer
+
+        Returns:
+        string
+
+        """
+        if not arguments:
+            return js
+
+        parts = []
+        position = 0
+        for name, start, end, first in arguments:
+            parts.append(js[position:start])
+            parts.append(self.rewriteString(name, js[start:end]))
+            position = end
+
+        parts.append(js[position:])
+        return "".join(parts)
+
+    def rewriteString(self, name, string):
+        """rewrites a single string literal passed to a selector call
+
+        Arguments:
+        name -- name of the selector function being called
+        string -- the string literal including its quotes
+
+        Returns:
+        string
+
+        """
+        use_ids = name not in self.config.class_selectors
+        use_classes = name not in self.config.id_selectors
+
+        if name in self.config.custom_selectors:
+            def replaceSelector(match):
+                token = match.group()
+                if token[0] == "#":
+                    if use_ids and token in self.id_map:
+                        return self.id_map[token]
+                elif use_classes and token in self.class_map:
+                    return self.class_map[token]
+                return token
+
+            return self.selector_regex.sub(replaceSelector, string)
+
+        value = string[1:-1]
+        if use_ids and "#" + value in self.id_map:
+            return string[0] + self.id_map["#" + value][1:] + string[-1]
+        if use_classes and "." + value in self.class_map:
+            return string[0] + self.class_map["." + value][1:] + string[-1]
+        return string
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import OrderedDict
+
+class LruCache(object):
+    """bounded dictionary that evicts the least recently used entry when it is full"""
+    def __init__(self, max_size = 1024):
+        """constructor
+
+        Arguments:
+        max_size -- maximum number of entries to hold
+
+        Returns:
+        void
+
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default = None):
+        """gets a value from the cache and marks it as recently used
+
+        Arguments:
+        key -- key to look up
+        default -- what to return if the key is not cached
+
+        Returns:
+        mixed
+
+        """
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """adds a value to the cache, evicting the oldest entry if needed
+
+        Arguments:
+        key -- key to store the value under
+        value -- value to store
+
+        Returns:
+        void
+
+        """
+        if self.max_size <= 0:
+            return
+
+        if key in self.entries:
+            del self.entries[key]
+        elif len(self.entries) >= self.max_size:
+            self.entries.popitem(last = False)
+
+        self.entries[key] = value
+
+    def clear(self):
+        """removes everything from the cache
+
+        Returns:
+        void
+
+        """
+        self.entries.clear()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
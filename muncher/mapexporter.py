@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os, json
+from util import Util
+
+class MapExporter(object):
+    """writes the final class and id maps as files that render time code can load
+
+    a python module, an es module or a compact json file is picked by the
+    extension of the path.  names are written without their . or # prefix so
+    templates that build class names at render time can look up the munched
+    name directly instead of rewriting their output afterwards.
+    """
+    formats = {".py": "python", ".js": "es", ".mjs": "es", ".json": "json"}
+
+    header = "generated by html-muncher from the final class and id map, do not edit"
+
+    # read only lookup object written into python modules
+    python_names = '''class Names(object):
+    """read only lookup of original names to munched names
+
+    names that were not munched are given back as they are
+    """
+    __slots__ = ("_names",)
+
+    def __init__(self, names):
+        object.__setattr__(self, "_names", names)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("munched names are read only")
+
+    def __getitem__(self, name):
+        return self._names.get(name, name)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def get(self, name, default = None):
+        return self._names.get(name, default)
+'''
+
+    @staticmethod
+    def getFormat(path):
+        """gets which format to write a path in
+
+        Arguments:
+        path -- path ending in .py, .js, .mjs or .json
+
+        Returns:
+        string|None -- "python", "es" or "json"
+
+        """
+        return MapExporter.formats.get(os.path.splitext(path)[1].lower())
+
+    @staticmethod
+    def getNames(name_map):
+        """gets a map without the . or # prefixes, sorted by original name
+
+        Arguments:
+        name_map -- map of names with prefix to new names with prefix
+
+        Returns:
+        list -- tuples of (name, new name)
+
+        """
+        return sorted((name[1:], new_name[1:]) for name, new_name in name_map.iteritems())
+
+    @staticmethod
+    def getPython(class_map, id_map):
+        """gets a python module with classes and ids lookup objects
+
+        Arguments:
+        class_map -- map of classes to new classes
+        id_map -- map of ids to new ids
+
+        Returns:
+        string
+
+        """
+        lines = ["# " + MapExporter.header, "", MapExporter.python_names]
+        for variable, name_map in (("classes", class_map), ("ids", id_map)):
+            lines.append(variable + " = Names({")
+            for name, new_name in MapExporter.getNames(name_map):
+                lines.append("    " + repr(name) + ": " + repr(new_name) + ",")
+            lines.append("})")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def getEsModule(class_map, id_map):
+        """gets an es module that exports frozen classes and ids objects
+
+        Arguments:
+        class_map -- map of classes to new classes
+        id_map -- map of ids to new ids
+
+        Returns:
+        string
+
+        """
+        lines = ["// " + MapExporter.header]
+        for variable, name_map in (("classes", class_map), ("ids", id_map)):
+            lines.append("export const " + variable + " = Object.freeze({")
+            for name, new_name in MapExporter.getNames(name_map):
+                lines.append("    " + json.dumps(name) + ": " + json.dumps(new_name) + ",")
+            lines.append("});")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def getJson(class_map, id_map):
+        """gets the maps as json without any whitespace
+
+        Arguments:
+        class_map -- map of classes to new classes
+        id_map -- map of ids to new ids
+
+        Returns:
+        string
+
+        """
+        data = {"classes": dict(MapExporter.getNames(class_map)), "ids": dict(MapExporter.getNames(id_map))}
+        return json.dumps(data, sort_keys = True, separators = (",", ":"))
+
+    @staticmethod
+    def export(path, class_map, id_map):
+        """writes the maps to a path in the format its extension asks for
+
+        a file that already has the same contents is left alone so anything
+        watching it is not reloaded for nothing
+
+        Arguments:
+        path -- path to write to
+        class_map -- map of classes to new classes
+        id_map -- map of ids to new ids
+
+        Returns:
+        bool -- whether or not the file was written
+
+        """
+        format = MapExporter.getFormat(path)
+        if format == "python":
+            contents = MapExporter.getPython(class_map, id_map)
+        elif format == "es":
+            contents = MapExporter.getEsModule(class_map, id_map)
+        else:
+            contents = MapExporter.getJson(class_map, id_map)
+
+        if Util.fileMatches(path, contents):
+            return False
+
+        Util.filePutContents(path, contents)
+        return True
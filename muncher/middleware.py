@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+from config import Config
+from muncher import Muncher
+from lrucache import LruCache
+
+class MunchMiddleware(object):
+    """wsgi middleware that munches text/html responses on the fly
+
+    uses a map saved with --map-out so dynamically rendered pages get the same
+    names as the munched stylesheets and scripts.  the body is rewritten as it
+    streams through, split right after the last tag that is not inside of a
+    <style> or <script> block, and every rewritten piece is kept in an lru
+    cache keyed by its hash so repeated pages and fragments are only rewritten once.
+    """
+    def __init__(self, app, map_path, config = None, cache_size = 1024, minimize = False):
+        """constructor
+
+        Arguments:
+        app -- wsgi application to wrap
+        map_path -- path to a json map saved with --map-out
+        config -- Config object with the js selectors to use (defaults to a new Config)
+        cache_size -- how many rewritten pieces to remember
+        minimize -- whether or not to minimize the html
+
+        Returns:
+        void
+
+        """
+        self.app = app
+        self.minimize = minimize
+        self.muncher = Muncher(config if config is not None else Config())
+        class_map, id_map = self.muncher.loadMap(map_path)
+        self.muncher.setMaps(class_map, id_map)
+        self.cache = LruCache(cache_size)
+
+    def __call__(self, environ, start_response):
+        """handles a single request
+
+        Arguments:
+        environ -- wsgi environment
+        start_response -- wsgi start_response callable
+
+        Returns:
+        iterable
+
+        """
+        state = {}
+
+        def munchStartResponse(status, headers, exc_info = None):
+            state["munch"] = MunchMiddleware.shouldMunch(headers)
+            if state["munch"]:
+                # the body is going to change size
+                headers = [header for header in headers if header[0].lower() != "content-length"]
+            return start_response(status, headers, exc_info)
+
+        result = self.app(environ, munchStartResponse)
+
+        if state.get("munch") is False:
+            return result
+
+        return self.munchBody(result, state)
+
+    @staticmethod
+    def shouldMunch(headers):
+        """checks if a response is html that we can rewrite
+
+        Arguments:
+        headers -- list of (name, value) response headers
+
+        Returns:
+        bool
+
+        """
+        is_html = False
+        for name, value in headers:
+            name = name.lower()
+            if name == "content-type":
+                is_html = value.split(";")[0].strip().lower() == "text/html"
+            elif name == "content-encoding" and value.strip().lower() != "identity":
+                return False
+
+        return is_html
+
+    def munchBody(self, result, state):
+        """rewrites a response body as it streams through
+
+        Arguments:
+        result -- iterable returned by the application
+        state -- dictionary that says whether the response should be munched
+
+        Returns:
+        generator
+
+        """
+        try:
+            carry = ""
+            for chunk in result:
+                if not state.get("munch"):
+                    yield chunk
+                    continue
+
+                html = carry + chunk
+                end = MunchMiddleware.getSafeEnd(html, self.getBlockTags())
+                carry = html[end:]
+                if end > 0:
+                    yield self.munch(html[:end])
+
+            if carry:
+                yield self.munch(carry)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+    def getBlockTags(self):
+        """gets the elements a piece of the body must not end inside of
+
+        minimizing has to see the whole of a pre or textarea to leave its text alone
+
+        Returns:
+        tuple
+
+        """
+        if self.minimize:
+            return ("style", "script", "pre", "textarea")
+
+        return ("style", "script")
+
+    @staticmethod
+    def getSafeEnd(html, tags = ("style", "script")):
+        """gets the position right after the last tag that is not inside of one of the given elements
+
+        Arguments:
+        html -- html received so far
+        tags -- names of the elements to keep whole
+
+        Returns:
+        int
+
+        """
+        end = html.rfind(">") + 1
+        lower = html[:end].lower()
+
+        # a > inside of a comment that is not closed yet does not end a tag
+        start = lower.rfind("<!--")
+        if start != -1 and lower.find("-->", start + 2) == -1:
+            end = start
+
+        for tag in tags:
+            start = lower.rfind("<" + tag)
+            if start != -1 and lower.find("</" + tag, start) == -1:
+                end = min(end, start)
+
+        return end
+
+    def munch(self, html):
+        """rewrites a piece of html, using the cache if we have seen it before
+
+        Arguments:
+        html -- html to rewrite
+
+        Returns:
+        string
+
+        """
+        key = hashlib.sha1(html).digest()
+        new_html = self.cache.get(key)
+        if new_html is None:
+            new_html = self.muncher.optimizeContents(html, "html", self.minimize)
+            self.cache.set(key, new_html)
+
+        return new_html
@@ -13,11 +13,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import sys, re, glob, os
-from operator import itemgetter
+import sys, re, glob, os, multiprocessing, marshal, json, cProfile
 from util import Util
-from varfactory import VarFactory
+from nameallocator import NameAllocator
+from nameclusterer import NameClusterer
 from sizetracker import SizeTracker
+from cssrewriter import CssRewriter
+from csspruner import CssPruner
+from htmlrewriter import HtmlRewriter
+from htmlsegmenter import HtmlSegmenter
+from htmlminifier import HtmlMinifier
+from cssminifier import CssMinifier
+from jsminifier import JsMinifier
+from jsrewriter import JsRewriter
+from mapexporter import MapExporter
+from cache import Cache
+from documentstore import DocumentStore
+from profiler import Profiler
+from watcher import Watcher
+import workers
 
 class Muncher(object):
     def __init__(self, config):
@@ -31,8 +45,34 @@ class Muncher(object):
         self.class_counter = {}
         self.id_map = {}
         self.class_map = {}
+        self.css_rewriter = None
+        self.html_rewriter = None
+        self.js_rewriter = None
+        self.used_names = None
+        self.css_pruner = None
+        self.optimize_pool = None
+        self.compress_pool = None
+        self.compress_results = []
+        self.scan_digest = None
+        self.map_digest = None
+        self.file_counters = {} if config.watch else None
+        self.track_sizes = config.shouldTrackSizes()
         self.config = config
 
+        SizeTracker.configure(config.compressors, config.compression_level)
+
+        self.cache = None
+        if config.cache_dir is not None:
+            self.cache = Cache(config.cache_dir, config.cache_size)
+
+        self.documents = DocumentStore(config.document_cache_size)
+
+        self.profile_hooks = []
+        self.profiler = None
+        if config.profile:
+            self.profiler = Profiler()
+            self.addProfileHook(self.profiler.record)
+
     @staticmethod
     def showUsage():
         """shows usage information for this script"""
@@ -53,8 +93,17 @@ class Muncher(object):
         print ""
         print "--ignore {classes,ids}       comma separated list of classes or ids to ignore when rewriting css (ie .sick_class,#sweet_id)"
         print ""
-        print "--compress-html              strips new line characters to compress html files specified with --html"
-        print "                             be careful when using this becuase it has not been thoroughly tested"
+        print "--blocklist {words}          comma separated list of words that should never be used as a new class or id name"
+        print "                             \"ad\" is always blocked since adblock extensions hide it (ie ads,banner,sponsor)"
+        print ""
+        print "--lowercase-names            only use lowercase letters for new class and id names"
+        print "                             use this if any of your tooling treats class names and ids as case insensitive"
+        print ""
+        print "--compress-html              collapses whitespace and drops comments in html files specified with --html"
+        print "                             inline style and script blocks are minified as well"
+        print ""
+        print "--minify                     strips comments and whitespace from css and js files while rewriting them"
+        print "                             including style and script blocks in views"
         print ""
         print "--framework                  name of js framework to use for selectors (currently only jquery or mootools)"
         print ""
@@ -74,6 +123,60 @@ class Muncher(object):
         print ""
         print "--show-savings               will output how many bytes were saved by munching"
         print ""
+        print "--compressors {names}        comma separated compressors to measure savings with (gzip, bz2 or lzma, defaults to gzip)"
+        print ""
+        print "--compression-level {1-9}    compression level used to measure savings (defaults to 9)"
+        print ""
+        print "--savings-report {path}      json file to save the size of every file before and after munching to"
+        print ""
+        print "--size-budget {size}[,{total}]"
+        print "                             fail if any munched file or all munched files together are bigger than this once compressed"
+        print "                             with the first of --compressors (ie 20KB,200KB or ,200KB for only a total)"
+        print ""
+        print "--precompress {names}        write compressed copies next to every munched file (gzip, bz2 or xz)"
+        print "                             for servers that can send them as is, copies that are still current are skipped"
+        print ""
+        print "--stream                     rewrite standalone css and js files a chunk at a time instead of reading them into memory"
+        print "                             use this for very large generated stylesheets or bundles"
+        print ""
+        print "--cache-dir {path}           directory to cache search and rewrite results in so unchanged files are skipped next time"
+        print ""
+        print "--cache-size {size}          maximum size of the cache directory, least recently used entries are removed (defaults to 100MB)"
+        print ""
+        print "--gzip-names                 give names that are used together similar new names when that makes"
+        print "                             a sample of the munched files smaller once gzipped"
+        print ""
+        print "--document-cache-size {size}"
+        print "                             how much of the files read while searching to keep in memory for rewriting (defaults to 64MB)"
+        print ""
+        print "--map-in {path}              json file with the class and id map from a previous run"
+        print "                             names that are still used keep the same short name so unchanged files stay the same"
+        print ""
+        print "--map-out {path}             json file to save the final class and id map to"
+        print ""
+        print "--map-export {paths}         comma separated files to write the final class and id map to for render time lookups"
+        print "                             .py writes a python module, .js or .mjs an es module and .json compact json"
+        print ""
+        print "--map-compact {percent}      ignore the --map-in names when keeping them costs more than this percent"
+        print "                             over assigning every name from scratch"
+        print ""
+        print "--prune-unused               drop css rules for classes and ids that are not used in any view or js file"
+        print ""
+        print "--safelist {names}           comma separated classes or ids to always keep and never rename with --prune-unused, * matches anything"
+        print "                             (ie .active,#modal,btn-*)"
+        print ""
+        print "--watch                      keep running and re-munch files as soon as they change"
+        print ""
+        print "--watch-interval {seconds}   how often to check for changed files in watch mode (defaults to 0.5)"
+        print ""
+        print "--jobs {number}              number of processes to use for searching and rewriting files (defaults to 1)"
+        print ""
+        print "--profile                    show the time spent in each phase and the slowest files"
+        print ""
+        print "--profile-top {number}       how many of the slowest files to show with --profile (defaults to 10)"
+        print ""
+        print "--profile-dump {path}        save cProfile stats for the whole run to a file that pstats can read"
+        print ""
         print "--verbose                    output more information while the script runs"
         print ""
         print "--help                       shows this menu\n"
@@ -86,42 +189,155 @@ class Muncher(object):
         void
 
         """
+        profile = None
+        if self.config.profile_dump is not None:
+            profile = cProfile.Profile()
+            profile.enable()
+
         self.output("searching for classes and ids...", False)
 
         if self.config.js_manifest is not None:
             self.outputJsWarnings()
 
-        self.processCss()
-        self.processViews()
+        self.profileCall("phase", "scan", self.processFiles)
 
-        if self.config.js_manifest is None:
-            self.processJs()
-        else:
-            self.processJsManifest()
+        if self.config.js_manifest is not None:
+            self.profileCall("phase", "manifest", self.processJsManifest)
+
+        if self.config.prune_unused:
+            self.profileCall("phase", "usage", self.processUsedNames)
 
         self.output("mapping classes and ids to new names...", False)
         # maps all classes and ids found to shorter names
-        self.processMaps()
+        self.profileCall("phase", "maps", self.processMaps)
 
         # optimize everything
         self.output("munching css files...", False)
-        self.optimizeFiles(self.config.css, self.optimizeCss)
+        self.profileCall("phase", "css", self.optimizeFiles, self.config.css, self.optimizeCss)
 
         self.output("munching html files...", False)
-        self.optimizeFiles(self.config.views, self.optimizeHtml, self.config.view_extension, self.config.compress_html)
+        self.profileCall("phase", "html", self.optimizeFiles, self.config.views, self.optimizeHtml, self.config.view_extension, self.config.compress_html)
 
         self.output("munching js files...", False)
 
         if self.config.js_manifest is None:
-            self.optimizeFiles(self.config.js, self.optimizeJavascript)
+            self.profileCall("phase", "js", self.optimizeFiles, self.config.js, self.optimizeJavascript)
         else:
-            self.optimizeJsManifest()
+            self.profileCall("phase", "js", self.optimizeJsManifest)
+
+        self.profileCall("phase", "finish", self.closePools)
+
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(self.config.profile_dump)
 
         self.output("done", False)
 
+        if self.profiler is not None:
+            self.output(self.profiler.getReport(self.config.profile_top), False)
+
         if self.config.show_savings:
             self.output(SizeTracker.savings(), False)
 
+        if self.config.savings_report is not None:
+            SizeTracker.saveReport(self.config.savings_report)
+
+        self.checkSizeBudget()
+
+        if self.config.watch:
+            Watcher(self, self.config.watch_interval).watch()
+
+    def closePools(self):
+        """waits for all worker processes to finish and cleans up the cache
+
+        Returns:
+        void
+
+        """
+        self.closeOptimizePool()
+        self.closeCompressPool()
+
+        if self.cache is not None:
+            self.cache.prune()
+
+    def addProfileHook(self, hook):
+        """adds a function that gets called with timings while munching
+
+        the hook is called as hook(kind, name, seconds, size) where kind is
+        "phase" for each phase of run() and "scan" or "optimize" for each file,
+        name is the phase or the path to the file and size is the size of the
+        file in bytes (None for phases)
+
+        Arguments:
+        hook -- function to call
+
+        Returns:
+        void
+
+        """
+        self.profile_hooks.append(hook)
+
+    def profileCall(self, kind, name, callback, *args):
+        """calls a function and reports how long it took to the profile hooks
+
+        with no hooks the function is just called
+
+        Arguments:
+        kind -- "phase", "scan" or "optimize"
+        name -- name of the phase or path to the file
+        callback -- function to call
+        args -- arguments to pass to the function
+
+        Returns:
+        whatever the function returns
+
+        """
+        if not self.profile_hooks:
+            return callback(*args)
+
+        start = Profiler.timer()
+        result = callback(*args)
+        self.callProfileHooks(kind, name, Profiler.timer() - start)
+        return result
+
+    def callProfileHooks(self, kind, name, seconds):
+        """reports a timing to every profile hook
+
+        Arguments:
+        kind -- "phase", "scan" or "optimize"
+        name -- name of the phase or path to the file
+        seconds -- how long it took
+
+        Returns:
+        void
+
+        """
+        size = None
+        if kind != "phase":
+            try:
+                size = os.path.getsize(name)
+            except OSError:
+                pass
+
+        for hook in self.profile_hooks:
+            hook(kind, name, seconds, size)
+
+    def checkSizeBudget(self):
+        """exits with an error if any munched file or the total is over the size budget
+
+        Returns:
+        void
+
+        """
+        errors = SizeTracker.getBudgetErrors(self.config.file_size_budget, self.config.total_size_budget)
+        if not errors:
+            return
+
+        for error in errors:
+            self.output("over budget: " + error, False)
+
+        sys.exit(1)
+
     def outputJsWarnings(self):
         pass
 
@@ -141,92 +357,369 @@ class Muncher(object):
 
         print text
 
-    def processCssDirectory(self, file):
-        """processes a directory of css files
+    def getFiles(self, paths):
+        """gets all files from a list of files and directories
 
         Arguments:
-        file -- path to directory
+        paths -- list of files and directories
+
+        Returns:
+        list
+
+        """
+        files = []
+        for path in paths:
+            if not Util.isDir(path):
+                files.append(path)
+                continue
+            self.addDirectoryFiles(path, files)
+
+        return files
+
+    def addDirectoryFiles(self, path, files):
+        """adds every file in a directory and its subdirectories to a list
+
+        Arguments:
+        path -- path to directory
+        files -- list to add the files to
 
         Returns:
         void
 
         """
-        if ".svn" in file:
+        if ".svn" in path:
             return
 
-        for dir_file in Util.getFilesFromDir(file):
+        for dir_file in Util.getFilesFromDir(path):
             if Util.isDir(dir_file):
-                self.processCssDirectory(dir_file)
+                self.addDirectoryFiles(dir_file, files)
                 continue
 
-            self.processCssFile(dir_file)
+            files.append(dir_file)
 
-    def processCss(self):
-        """gets all css files from config and processes them to see what to replace
+    def getScanTasks(self):
+        """gets every file that has to be searched for classes and ids
+
+        Returns:
+        list -- tuples of (type, path) where type is "css", "view" or "js"
+
+        """
+        tasks = [("css", file) for file in self.getFiles(self.config.css)]
+        tasks += [("view", file) for file in self.getFiles(self.config.views)]
+
+        if self.config.js_manifest is None:
+            tasks += [("js", file) for file in self.getFiles(self.config.js)]
+
+        return tasks
+
+    def processFiles(self):
+        """searches all css, view and js files for classes and ids
+
+        with more than one job the files are spread across a pool of worker
+        processes and the counts they find are merged back in file order
 
         Returns:
         void
 
         """
-        files = self.config.css
-        for file in files:
-            if not Util.isDir(file):
-                self.processCssFile(file)
-                continue
-            self.processCssDirectory(file)
+        tasks = self.getScanTasks()
+
+        if self.config.jobs < 2 or len(tasks) < 2:
+            for type, path in tasks:
+                self.profileCall("scan", path, self.scanFile, type, path)
+            return
 
-    def processViewDirectory(self, file):
-        """processes a directory of view files
+        pool = multiprocessing.Pool(self.config.jobs, workers.initScanWorker, (self.config,))
+        try:
+            chunk_size = max(1, len(tasks) // (self.config.jobs * 4))
+            results = pool.imap(workers.scanFile, tasks, chunk_size)
+            for (type, path), (id_counter, class_counter, seconds) in zip(tasks, results):
+                self.addFileCounters(path, id_counter, class_counter)
+                if self.profile_hooks:
+                    self.callProfileHooks("scan", path, seconds)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    def scanFile(self, type, path):
+        """searches a single file for classes and ids
 
         Arguments:
-        file -- path to directory
+        type -- "css", "view" or "js"
+        path -- path to file
 
         Returns:
         void
 
         """
-        if ".svn" in file:
-            return
+        id_counter, class_counter = self.getFileCounters(type, path)
+        self.addFileCounters(path, id_counter, class_counter)
 
-        for dir_file in Util.getFilesFromDir(file):
-            if Util.isDir(dir_file):
-                self.processViewDirectory(dir_file)
-                continue
+    def addFileCounters(self, path, id_counter, class_counter):
+        """adds the counts found in a single file to the totals
 
-            self.processView(dir_file)
+        in watch mode the counts for each file are kept around so they can be
+        taken back out when the file changes
 
-    def processViews(self):
-        """processes all view files
+        Arguments:
+        path -- path to file
+        id_counter -- dictionary of ids to bytes saved in this file
+        class_counter -- dictionary of classes to bytes saved in this file
 
         Returns:
         void
 
         """
-        files = self.config.views
-        for file in files:
-            if not Util.isDir(file):
-                self.processView(file)
-                continue
-            self.processViewDirectory(file)
+        if self.file_counters is not None:
+            self.file_counters[path] = (id_counter, class_counter)
+
+        self.mergeCounters(id_counter, class_counter)
 
-    def processJsDirectory(self, file):
-        """processes a directory of js files
+    def getFileCounters(self, type, path):
+        """counts the classes and ids in a single file, using the cache if there is one
 
         Arguments:
-        file -- path to directory
+        type -- "css", "view" or "js"
+        path -- path to file
+
+        Returns:
+        tuple -- (id counter, class counter) for this file only
+
+        """
+        use_cache = self.cache is not None and not (self.config.stream and type != "view")
+        if use_cache:
+            contents = self.documents.getContents(path)
+            key = Cache.getKey("scan", type, self.getScanDigest(), contents)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return marshal.loads(cached)
+
+        totals = (self.id_counter, self.class_counter)
+        self.id_counter = {}
+        self.class_counter = {}
+        try:
+            if not use_cache:
+                self.scanPath(type, path)
+            else:
+                self.scanContents(type, contents, path)
+                self.cache.set(key, marshal.dumps((self.id_counter, self.class_counter)))
+            return self.id_counter, self.class_counter
+        finally:
+            self.id_counter, self.class_counter = totals
+
+    def scanPath(self, type, path):
+        """searches a single file for classes and ids and adds them to the counters
+
+        Arguments:
+        type -- "css", "view" or "js"
+        path -- path to file
 
         Returns:
         void
 
         """
-        if ".svn" in file:
-            return
+        if type == "css":
+            return self.processCssFile(path)
 
-        for dir_file in Util.getFilesFromDir(file):
-            if Util.isDir(dir_file):
-                self.processJsDirectory(dir_file)
-                continue
-            self.processJsFile(dir_file)
+        if type == "view":
+            return self.processView(path)
+
+        return self.processJsFile(path)
+
+    def scanContents(self, type, contents, path = None):
+        """searches the contents of a single file for classes and ids
+
+        Arguments:
+        type -- "css", "view" or "js"
+        contents -- contents of the file
+        path -- path to the file if the contents came from one
+
+        Returns:
+        void
+
+        """
+        if type == "css":
+            return self.processCssContents(contents)
+
+        if type == "view":
+            return self.processViewContents(contents, path)
+
+        return self.processJsContents(contents)
+
+    def getScanDigest(self):
+        """gets a digest of the config settings that change what a scan finds
+
+        Returns:
+        string
+
+        """
+        if self.scan_digest is None:
+            settings = (self.config.custom_selectors, self.config.id_selectors, self.config.class_selectors, self.config.ignore, self.config.js_manifest is None)
+            self.scan_digest = Cache.getKey(marshal.dumps(settings))
+
+        return self.scan_digest
+
+    def getMapDigest(self):
+        """gets a digest of the final maps and the config settings that change rewritten output
+
+        Returns:
+        string
+
+        """
+        if self.map_digest is None:
+            used = sorted(self.used_names) if self.getCssPruner() is not None else None
+            settings = (sorted(self.class_map.items()), sorted(self.id_map.items()), self.config.custom_selectors, self.config.id_selectors, self.config.class_selectors, self.config.compress_html, self.config.minify, used, self.config.ignore, self.config.safelist)
+            self.map_digest = Cache.getKey(marshal.dumps(settings))
+
+        return self.map_digest
+
+    def mergeCounters(self, id_counter, class_counter):
+        """adds counts found somewhere else (such as a worker process) to our own
+
+        Arguments:
+        id_counter -- dictionary of ids to bytes saved
+        class_counter -- dictionary of classes to bytes saved
+
+        Returns:
+        void
+
+        """
+        for name, length in id_counter.iteritems():
+            self.id_counter[name] = self.id_counter.get(name, 0) + length
+
+        for name, length in class_counter.iteritems():
+            self.class_counter[name] = self.class_counter.get(name, 0) + length
+
+    def removeCounters(self, id_counter, class_counter):
+        """takes counts that were added with mergeCounters back out
+
+        Arguments:
+        id_counter -- dictionary of ids to bytes saved
+        class_counter -- dictionary of classes to bytes saved
+
+        Returns:
+        void
+
+        """
+        for counter, totals in ((id_counter, self.id_counter), (class_counter, self.class_counter)):
+            for name, length in counter.iteritems():
+                totals[name] -= length
+                if totals[name] <= 0:
+                    del totals[name]
+
+    @staticmethod
+    def getContentType(content_type):
+        """turns a content type into the type of document we are dealing with
+
+        Arguments:
+        content_type -- "css", "html", "js" or a mime type such as "text/css"
+
+        Returns:
+        string -- "css", "view" or "js"
+
+        """
+        content_type = content_type.split(";")[0].strip().lower()
+        if content_type in ("css", "text/css"):
+            return "css"
+
+        if content_type in ("html", "view", "text/html", "application/xhtml+xml"):
+            return "view"
+
+        if content_type in ("js", "javascript", "text/javascript", "application/javascript", "application/x-javascript"):
+            return "js"
+
+        raise ValueError("unknown content type " + content_type)
+
+    def processContents(self, contents, content_type):
+        """finds all classes and ids to replace in a document that is already in memory
+
+        Arguments:
+        contents -- contents of the document as a string or unicode
+        content_type -- "css", "html", "js" or a mime type such as "text/css"
+
+        Returns:
+        void
+
+        """
+        if isinstance(contents, unicode):
+            contents = contents.encode("utf-8")
+
+        self.scanContents(Muncher.getContentType(content_type), contents)
+
+    def optimizeContents(self, contents, content_type, minimize = False):
+        """replaces classes and ids in a document that is already in memory
+
+        the maps have to be built first, either with processContents and processMaps
+        or by passing maps from loadMap to setMaps
+
+        Arguments:
+        contents -- contents of the document as a string or unicode
+        content_type -- "css", "html", "js" or a mime type such as "text/css"
+        minimize -- whether or not we should minimize the contents (html)
+
+        Returns:
+        string -- unicode if unicode was passed in
+
+        """
+        is_unicode = isinstance(contents, unicode)
+        if is_unicode:
+            contents = contents.encode("utf-8")
+
+        type = Muncher.getContentType(content_type)
+        if type == "css":
+            contents = self.replaceCss(contents, self.config.minify)
+        elif type == "view":
+            contents = self.optimizeHtml(None, contents)
+        else:
+            contents = self.replaceJavascript(contents, self.config.minify)
+
+        if minimize is True:
+            contents = self.minimize(contents)
+
+        if is_unicode:
+            return contents.decode("utf-8")
+
+        return contents
+
+    def munchContents(self, documents):
+        """munches a set of documents that are already in memory without touching the filesystem
+
+        Arguments:
+        documents -- list of (contents, content type) tuples
+
+        Returns:
+        list -- the rewritten contents in the same order
+
+        """
+        for contents, content_type in documents:
+            self.processContents(contents, content_type)
+
+        self.processMaps()
+
+        return [self.optimizeContents(contents, content_type) for contents, content_type in documents]
+
+    def processCss(self):
+        """gets all css files from config and processes them to see what to replace
+
+        Returns:
+        void
+
+        """
+        for file in self.getFiles(self.config.css):
+            self.processCssFile(file)
+
+    def processViews(self):
+        """processes all view files
+
+        Returns:
+        void
+
+        """
+        for file in self.getFiles(self.config.views):
+            self.processView(file)
 
     def processJs(self):
         """gets all js files from config and processes them to see what to replace
@@ -235,12 +728,8 @@ class Muncher(object):
         void
 
         """
-        files = self.config.js
-        for file in files:
-            if not Util.isDir(file):
-                self.processJsFile(file)
-                continue
-            self.processJsDirectory(file)
+        for file in self.getFiles(self.config.js):
+            self.processJsFile(file)
 
     def processView(self, file):
         """processes a single view file
@@ -249,8 +738,40 @@ class Muncher(object):
         file -- path to directory
 
         """
-        self.processCssFile(file, True)
-        self.processJsFile(file, True)
+        self.processViewContents(self.documents.getContents(file), file)
+
+    def processViewContents(self, html, path = None):
+        """finds all classes and ids to replace in the inline css and js of a view
+
+        Arguments:
+        html -- contents of the view
+        path -- path to the view if the contents came from one
+
+        Returns:
+        void
+
+        """
+        segments = self.getViewSegments(path, html)
+        self.processCssContents("".join(text for type, text in segments if type == "style"))
+        for type, text in segments:
+            if type == "script":
+                self.processJsContents(text)
+
+    def getViewSegments(self, path, html):
+        """gets the segments of a view, keeping them around so the view is only split once
+
+        Arguments:
+        path -- path to the view or None if it did not come from a file
+        html -- contents of the view
+
+        Returns:
+        list -- tuples of (type, text) from getSegments
+
+        """
+        if path is None:
+            return Muncher.getSegments(html)
+
+        return self.documents.getSegments(path, html, Muncher.getSegments)
 
     def processCssFile(self, path, inline = False):
         """processes a single css file to find all classes and ids to replace
@@ -262,13 +783,31 @@ class Muncher(object):
         void
 
         """
-        contents = Util.fileGetContents(path)
+        # no class or id can span a closing brace so big files can be searched a piece at a time
+        if inline is False and self.config.stream:
+            for contents in Util.splitChunks(Util.fileGetChunks(path, self.config.chunk_size), "}"):
+                self.processCssContents(contents)
+            return
+
+        contents = self.documents.getContents(path)
         if inline is True:
             blocks = self.getCssBlocks(contents)
             contents = ""
             for block in blocks:
                 contents = contents + block
 
+        self.processCssContents(contents)
+
+    def processCssContents(self, contents):
+        """finds all classes and ids to replace in a block of css
+
+        Arguments:
+        contents -- css to search
+
+        Returns:
+        void
+
+        """
         ids_found = re.findall(r'((?<!\:\s)(?<!\:)#\w+)(\.|\{|,|\s|#)', contents, re.DOTALL)
         classes_found = re.findall(r'(?!\.[0-9])\.\w+', contents)
         self.addIds(ids_found)
@@ -278,139 +817,508 @@ class Muncher(object):
         """processes a single js file to find all classes and ids to replace
 
         Arguments:
-        path -- path to css file to process
+        path -- path to css file to process
+
+        Returns:
+        void
+
+        """
+        # the lexer carries open calls and unfinished tokens over so big files can be searched a piece at a time
+        if inline is False and self.config.stream:
+            for contents, arguments in self.config.getJsLexer().lexChunks(Util.fileGetChunks(path, self.config.chunk_size)):
+                self.processJsArguments(contents, arguments)
+            return
+
+        contents = self.documents.getContents(path)
+        if inline is True:
+            blocks = self.getJsBlocks(contents)
+            contents = ""
+            for block in blocks:
+                contents = contents + block
+
+        self.processJsContents(contents)
+
+    def processJsContents(self, contents):
+        """finds all classes and ids to replace in a block of javascript
+
+        Arguments:
+        contents -- javascript to search
+
+        Returns:
+        void
+
+        """
+        arguments = self.config.getJsLexer().lex(contents)[0]
+        self.processJsArguments(contents, arguments)
+
+    def processJsArguments(self, js, arguments):
+        """adds the classes and ids found in the string literals passed to js selector calls
+
+        Arguments:
+        js -- javascript the arguments were found in
+        arguments -- list of (selector, start, end, first) tuples from JsLexer
+
+        Returns:
+        void
+
+        """
+        for selector, start, end, first in arguments:
+            # leave out the quotes
+            value = js[start + 1:end - 1]
+            if selector in self.config.id_selectors:
+                if first and value:
+                    self.addId("#" + value)
+                continue
+
+            if selector in self.config.class_selectors:
+                if first and value:
+                    self.addClass("." + value)
+                continue
+
+            for match in re.findall(r'[#.]\w+', value):
+                if match[0] == "#":
+                    self.addId(match)
+                    continue
+
+                self.addClass(match)
+
+    def processJsManifest(self):
+        contents = Util.fileGetContents(self.config.js_manifest)
+        ids = re.findall(r'\s+?(var\s)?\${1}([A-Z0-9_]+)\s?=\s?[\'|\"](.*?)[\'|\"][,|;]', contents)
+        classes = re.findall(r'\s+?(var\s)?\${2}([A-Z0-9_]+)\s?=\s?[\'|\"](.*?)[\'|\"][,|;]', contents)
+
+        self.manifest_ids = {}
+        self.manifest_classes = {}
+
+        for id in ids:
+            self.addId("#" + id[2])
+            self.manifest_ids[id[1]] = id[2]
+
+        for manifest_class in classes:
+            self.addClass("." + manifest_class[2])
+            self.manifest_classes[manifest_class[1]] = manifest_class[2]
+
+    def optimizeJsManifest(self):
+        contents = Util.fileGetContents(self.config.js_manifest)
+
+        for key, value in self.manifest_ids.items():
+            if "#" + value in self.id_map:
+                contents = re.sub(r'((?<!\$)\${1}[A-Z0-9_]+\s?=\s?[\'|\"])(' + value + ')([\'|\"][,|;])', r'\1' + self.id_map["#" + value].replace("#", "") + r'\3', contents)
+
+        for key, value in self.manifest_classes.items():
+            if "." + value in self.class_map:
+                contents = re.sub(r'(\${2}[A-Z0-9_]+\s?=\s?[\'|\"])(' + value + ')([\'|\"][,|;])', r'\1' + self.class_map["." + value].replace(".", "") + r'\3', contents)
+
+        if self.config.rewrite_constants:
+            constants = re.findall(r'(\s+?(var\s)?([A-Z0-9_]+)\s?=\s?[\'|\"](.*?)[\'|\"][,|;])', contents)
+            new_constants = {}
+            i = 0
+            for constant in constants:
+                # underscore variables are ignored
+                if constant[2][0] == "_":
+                    continue
+
+                i += 1
+                new_constant = re.sub(r'=(.*)([,|;])','= ' + str(i) + r'\2', constant[0])
+                contents = contents.replace(constant[0], new_constant)
+
+        new_manifest = Util.prependExtension("opt", self.config.js_manifest)
+        Util.filePutContents(new_manifest, contents)
+        self.precompressFile(new_manifest)
+
+        if self.track_sizes:
+            SizeTracker.trackFile(self.config.js_manifest, new_manifest)
+
+    def processUsedNames(self):
+        """finds every class and id used in markup or javascript so unused css rules can be dropped
+
+        class and id attributes count for views and every word in a script
+        counts as both a class and an id, so names that are put together or
+        passed around in javascript are kept as long as they show up anywhere
+
+        Returns:
+        void
+
+        """
+        used = set()
+        for path in self.getFiles(self.config.views):
+            html = self.documents.getContents(path)
+            used.update(self.getHtmlRewriter().getNames(html))
+            for type, text in self.getViewSegments(path, html):
+                if type == "script":
+                    Muncher.addUsedWords(used, text)
+
+        for path in self.getFiles(self.config.js):
+            Muncher.addUsedWords(used, self.documents.getContents(path))
+
+        if self.config.js_manifest is not None:
+            used.update("." + name for name in self.manifest_classes.itervalues())
+            used.update("#" + name for name in self.manifest_ids.itervalues())
+
+        self.setUsedNames(used)
+
+    @staticmethod
+    def addUsedWords(used, js):
+        """adds every word in a script as a class and an id
+
+        Arguments:
+        used -- set of used names to add to
+        js -- contents of the script
+
+        Returns:
+        void
+
+        """
+        for word in set(re.findall(r'[\w-]+', js)):
+            used.add("." + word)
+            used.add("#" + word)
+
+    def setUsedNames(self, used):
+        """sets the classes and ids that css rules are kept for
+
+        Arguments:
+        used -- set of classes and ids with prefix or None to keep every rule
+
+        Returns:
+        void
+
+        """
+        self.used_names = used
+        self.css_pruner = None
+        self.map_digest = None
+
+    def getCssPruner(self):
+        """gets the pruner that drops unused css rules
+
+        Returns:
+        CssPruner|None -- None unless --prune-unused is on and the used names are known
+
+        """
+        if self.css_pruner is None and self.config.prune_unused and self.used_names is not None:
+            self.css_pruner = CssPruner(self.used_names, self.config.ignore, self.config.safelist)
+
+        return self.css_pruner
+
+    def getUsedCounter(self, counter):
+        """leaves out the names whose css rules are going to be dropped and the
+        safelisted names, which are kept as they are like ignored names
+
+        Arguments:
+        counter -- dictionary of classes or ids to bytes saved
+
+        Returns:
+        dict
+
+        """
+        pruner = self.getCssPruner()
+        if pruner is None:
+            return counter
+
+        return dict((name, count) for name, count in counter.iteritems() if pruner.isUsed(name) and not pruner.isSafelisted(name))
+
+    def processMaps(self, previous_classes = None, previous_ids = None):
+        """loops through classes and ids to process to determine shorter names to use for them
+        and creates a dictionary with these mappings
+
+        Arguments:
+        previous_classes -- class map to keep names from (defaults to the --map-in classes)
+        previous_ids -- id map to keep names from (defaults to the --map-in ids)
+
+        Returns:
+        void
+
+        """
+        if previous_classes is None and previous_ids is None:
+            previous_classes = {}
+            previous_ids = {}
+            if self.config.map_in is not None:
+                previous_classes, previous_ids = self.loadMap(self.config.map_in)
+
+        class_map = self.getStableNameMap(".", self.getUsedCounter(self.class_counter), previous_classes)
+        id_map = self.getStableNameMap("#", self.getUsedCounter(self.id_counter), previous_ids)
+
+        if self.config.gzip_names:
+            class_map, id_map = self.getGzipNameMaps(class_map, id_map, previous_classes, previous_ids)
+
+        self.setMaps(class_map, id_map)
+
+        if self.config.map_out is not None:
+            self.saveMap(self.config.map_out)
+
+        for path in self.config.map_exports:
+            if MapExporter.export(path, self.class_map, self.id_map):
+                self.output("writing maps to " + path)
+
+    def getGzipNameMaps(self, class_map, id_map, previous_classes, previous_ids):
+        """tries to reorder the new names so the munched files gzip better
+
+        names that are used together are given neighboring names of the same
+        length.  a sample of the files is munched with both the default names
+        and the reordered names and the reordered names are only used if the
+        sample really ends up smaller once gzipped.  names kept from a previous
+        map are never moved.
+
+        Arguments:
+        class_map -- default map of classes to new names
+        id_map -- default map of ids to new names
+        previous_classes -- class map the names were kept from
+        previous_ids -- id map the names were kept from
+
+        Returns:
+        tuple -- (class map, id map)
+
+        """
+        sample = self.getSample()
+        if not sample:
+            return class_map, id_map
+
+        clusterer = NameClusterer()
+        for type, contents in sample:
+            clusterer.addContents(type, contents)
+
+        new_class_map = clusterer.getNameMap(class_map, self.getFreshNames(class_map, self.class_counter, previous_classes))
+        new_id_map = clusterer.getNameMap(id_map, self.getFreshNames(id_map, self.id_counter, previous_ids))
+
+        default_size = self.getSampleSize(sample, class_map, id_map)
+        new_size = self.getSampleSize(sample, new_class_map, new_id_map)
+        SizeTracker.setNameSizes(len(sample), default_size, new_size)
+
+        self.output("gzip-aware names: " + SizeTracker.getSize(new_size) + " vs " + SizeTracker.getSize(default_size) + " gzipped with the default names (" + str(new_size - default_size) + " bytes) on a sample of " + str(len(sample)) + " files", False)
+
+        if new_size < default_size:
+            return new_class_map, new_id_map
+
+        return class_map, id_map
+
+    def getFreshNames(self, name_map, counter, previous):
+        """gets the names that were not kept from a previous map
+
+        Arguments:
+        name_map -- dictionary of names to new names
+        counter -- dictionary of names to bytes saved
+        previous -- dictionary of names to the new names they had last time
+
+        Returns:
+        list -- names in the order they were given new names
+
+        """
+        names = sorted(counter.items(), key = Muncher.getSavingsKey)
+        return [name for name, savings in names if name in name_map and previous.get(name) != name_map[name]]
+
+    def getSample(self):
+        """reads files to measure name maps against
+
+        files are taken in order until the sample is config.gzip_sample_size bytes
+
+        Returns:
+        list -- tuples of (type, contents)
+
+        """
+        sample = []
+        total = 0
+        for type, path in self.getScanTasks():
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+
+            if total + size > self.config.gzip_sample_size:
+                continue
+
+            sample.append((type, self.documents.getContents(path)))
+            total += size
+
+        return sample
+
+    def getSampleSize(self, sample, class_map, id_map):
+        """gets the gzipped size of a sample of files munched with a set of maps
+
+        Arguments:
+        sample -- list returned by getSample
+        class_map -- map of classes to new names
+        id_map -- map of ids to new names
+
+        Returns:
+        int
+
+        """
+        self.setMaps(class_map, id_map)
+        size = 0
+        for type, contents in sample:
+            size += SizeTracker.getGzipSize(self.optimizeContents(contents, type))
+
+        return size
+
+    def setMaps(self, class_map, id_map):
+        """sets the maps of classes and ids to their new names
+
+        Arguments:
+        class_map -- map of classes (with . prefix) to their new names
+        id_map -- map of ids (with # prefix) to their new names
+
+        Returns:
+        void
+
+        """
+        self.class_map = class_map
+        self.id_map = id_map
+        self.css_rewriter = None
+        self.html_rewriter = None
+        self.js_rewriter = None
+        self.map_digest = None
+
+    def getStableNameMap(self, prefix, counter, previous):
+        """maps classes or ids to new names, keeping the names they had last time if possible
+
+        if keeping the old names ends up costing more than config.map_compact percent
+        over assigning everything from scratch, the old names are thrown away
+
+        Arguments:
+        prefix -- either "." for classes or "#" for ids
+        counter -- dictionary of names to bytes saved
+        previous -- dictionary of names to the new names they had last time
+
+        Returns:
+        dict
+
+        """
+        name_map = self.getNameMap(prefix, counter, previous)
+        if not previous or self.config.map_compact is None:
+            return name_map
+
+        fresh_map = self.getNameMap(prefix, counter, {})
+        cost = Muncher.getMapCost(name_map, counter)
+        fresh_cost = Muncher.getMapCost(fresh_map, counter)
+        if cost > fresh_cost * (1 + self.config.map_compact / 100.0):
+            self.output("compacting " + prefix + " names, keeping the old names would cost " + str(cost - fresh_cost) + " extra bytes")
+            return fresh_map
+
+        return name_map
+
+    def getNameMap(self, prefix, counter, previous):
+        """maps classes or ids to new names
+
+        names that were mapped before keep their old name as long as it is still
+        free, everything else gets the next available name in order of savings
+
+        Arguments:
+        prefix -- either "." for classes or "#" for ids
+        counter -- dictionary of names to bytes saved
+        previous -- dictionary of names to the new names they had last time
 
         Returns:
-        void
+        dict
 
         """
-        contents = Util.fileGetContents(path)
-        if inline is True:
-            blocks = self.getJsBlocks(contents)
-            contents = ""
-            for block in blocks:
-                contents = contents + block
-
-        selectors = self.getJsSelectors(contents, self.config)
-        for selector in selectors:
-            if selector[0] in self.config.id_selectors:
-                if ',' in selector[2]:
-                    id_to_add = re.search(r'(\'|\")(.*?)(\'|\")', selector[2])
-                    if id_to_add is None:
-                        continue
-
-                    if not id_to_add.group(2):
-                        continue
+        # reverse sort so we can figure out the biggest savings
+        # ties are broken by name so the result doesn't depend on the order files were scanned in
+        names = sorted(counter.items(), key = Muncher.getSavingsKey)
 
-                    self.addId("#" + id_to_add.group(2))
+        # if the generated name already exists as a name to be processed
+        # we can't use it or bad things will happen
+        allocator = self.getNameAllocator(prefix, counter)
 
-                # if this is something like document.getElementById(variable) don't add it
-                if not '\'' in selector[2] and not '"' in selector[2]:
-                    continue
+        name_map = {}
+        for name, savings in names:
+            new_name = previous.get(name)
+            if new_name is not None and new_name[0:1] == prefix and allocator.isAvailable(new_name):
+                name_map[name] = new_name
+                allocator.reserve([new_name])
 
-                self.addId("#" + selector[2].strip("\"").strip("'"))
-                continue
+        if name_map:
+            self.output("keeping " + str(len(name_map)) + " of " + str(len(names)) + " " + prefix + " names from the previous map")
 
-            if selector[0] in self.config.class_selectors:
-                class_to_add = re.search(r'(\'|\")(.*?)(\'|\")', selector[2])
-                if class_to_add is None:
-                    continue
+        for name, savings in names:
+            if name not in name_map:
+                name_map[name] = allocator.getNext()
 
-                if not class_to_add.group(2):
-                    continue
+        return name_map
 
-                self.addClass("." + class_to_add.group(2))
-                continue
+    @staticmethod
+    def getMapCost(name_map, counter):
+        """gets roughly how many bytes the new names in a map will take up
 
-            if selector[0] in self.config.custom_selectors:
-                matches = re.findall(r'((#|\.)[a-zA-Z0-9_]*)', selector[2])
-                for match in matches:
-                    if match[1] == "#":
-                        self.addId(match[0])
-                        continue
+        Arguments:
+        name_map -- dictionary of names to new names
+        counter -- dictionary of names to bytes saved
 
-                    self.addClass(match[0])
+        Returns:
+        int
 
-    def processJsManifest(self):
-        contents = Util.fileGetContents(self.config.js_manifest)
-        ids = re.findall(r'\s+?(var\s)?\${1}([A-Z0-9_]+)\s?=\s?[\'|\"](.*?)[\'|\"][,|;]', contents)
-        classes = re.findall(r'\s+?(var\s)?\${2}([A-Z0-9_]+)\s?=\s?[\'|\"](.*?)[\'|\"][,|;]', contents)
+        """
+        cost = 0
+        for name, new_name in name_map.iteritems():
+            cost += counter[name] // len(name) * len(new_name)
+        return cost
 
-        self.manifest_ids = {}
-        self.manifest_classes = {}
+    def loadMap(self, path):
+        """loads class and id maps saved by saveMap
 
-        for id in ids:
-            self.addId("#" + id[2])
-            self.manifest_ids[id[1]] = id[2]
+        Arguments:
+        path -- path to json map file
 
-        for manifest_class in classes:
-            self.addClass("." + manifest_class[2])
-            self.manifest_classes[manifest_class[1]] = manifest_class[2]
+        Returns:
+        tuple -- (class map, id map)
 
-    def optimizeJsManifest(self):
-        contents = Util.fileGetContents(self.config.js_manifest)
+        """
+        if not Util.fileExists(path):
+            self.output("no map found at " + path + ", assigning all names from scratch", False)
+            return {}, {}
 
-        for key, value in self.manifest_ids.items():
-            if "#" + value in self.id_map:
-                contents = re.sub(r'((?<!\$)\${1}[A-Z0-9_]+\s?=\s?[\'|\"])(' + value + ')([\'|\"][,|;])', r'\1' + self.id_map["#" + value].replace("#", "") + r'\3', contents)
+        data = json.loads(Util.fileGetContents(path))
+        return Util.encodeDict(data.get("classes", {})), Util.encodeDict(data.get("ids", {}))
 
-        for key, value in self.manifest_classes.items():
-            if "." + value in self.class_map:
-                contents = re.sub(r'(\${2}[A-Z0-9_]+\s?=\s?[\'|\"])(' + value + ')([\'|\"][,|;])', r'\1' + self.class_map["." + value].replace(".", "") + r'\3', contents)
+    def saveMap(self, path):
+        """saves the class and id maps so the next run can keep the same names
 
-        if self.config.rewrite_constants:
-            constants = re.findall(r'(\s+?(var\s)?([A-Z0-9_]+)\s?=\s?[\'|\"](.*?)[\'|\"][,|;])', contents)
-            new_constants = {}
-            i = 0
-            for constant in constants:
-                # underscore variables are ignored
-                if constant[2][0] == "_":
-                    continue
+        Arguments:
+        path -- path to json map file
 
-                i += 1
-                new_constant = re.sub(r'=(.*)([,|;])','= ' + str(i) + r'\2', constant[0])
-                contents = contents.replace(constant[0], new_constant)
+        Returns:
+        void
 
-        new_manifest = Util.prependExtension("opt", self.config.js_manifest)
-        Util.filePutContents(new_manifest, contents)
+        """
+        data = {"classes": self.class_map, "ids": self.id_map}
+        Util.filePutContents(path, json.dumps(data, indent = 2, sort_keys = True, separators = (",", ": ")) + "\n")
 
-        if self.config.show_savings:
-            SizeTracker.trackFile(self.config.js_manifest, new_manifest)
+    @staticmethod
+    def getSavingsKey(item):
+        """sort key that puts the names saving the most bytes first
 
-    def processMaps(self):
-        """loops through classes and ids to process to determine shorter names to use for them
-        and creates a dictionary with these mappings
+        Arguments:
+        item -- tuple of (name, bytes saved)
 
         Returns:
-        void
+        tuple
 
         """
-        # reverse sort so we can figure out the biggest savings
-        classes = self.class_counter.items()
-        classes.sort(key = itemgetter(1), reverse=True)
+        return (-item[1], item[0])
 
-        for class_name, savings in classes:
-            small_class = "." + VarFactory.getNext("class")
+    def getNameAllocator(self, prefix, names):
+        """gets an allocator for new class or id names that will never hand out
+        an existing name, an ignored name, a safelisted name or a blocked word
 
-            # adblock extensions may block class "ad" so we should never generate it
-            # also if the generated class already exists as a class to be processed
-            # we can't use it or bad things will happen
-            while small_class == ".ad" or Util.keyInTupleList(small_class, classes):
-                small_class = "." + VarFactory.getNext("class")
+        Arguments:
+        prefix -- either "." for classes or "#" for ids
+        names -- existing names with prefix
 
-            self.class_map[class_name] = small_class
+        Returns:
+        NameAllocator
 
-        ids = self.id_counter.items()
-        ids.sort(key = itemgetter(1), reverse=True)
+        """
+        allocator = NameAllocator(prefix, names, self.config.blocklist, self.config.lowercase_names)
+        allocator.reserve(name for name in self.config.ignore if name[0:1] == prefix)
 
-        for id, savings in ids:
-            small_id = "#" + VarFactory.getNext("id")
+        # names left out of renaming by --prune-unused are still in the css,
+        # for example .a in .foo:not(.a), so none of them can be handed out
+        allocator.reserve(self.class_counter if prefix == "." else self.id_counter)
 
-            # same holds true for ids as classes
-            while small_id == "#ad" or Util.keyInTupleList(small_id, ids):
-                small_id = "#" + VarFactory.getNext("id")
+        pruner = self.getCssPruner()
+        if pruner is not None:
+            allocator.reserve(pruner.getSafelist(prefix))
+            allocator.reservePatterns(pruner.getPatterns(prefix))
 
-            self.id_map[id] = small_id
+        return allocator
 
     def incrementIdCounter(self, name):
         """called for every time an id is added to increment the bytes we will save
@@ -538,12 +1446,143 @@ class Muncher(object):
         void
 
         """
+        self.runOptimizeTasks(self.getOptimizeTasks(paths, callback, extension, minimize))
+
+    def getOptimizeTasks(self, paths, callback, extension = "", minimize = False):
+        """gets a task for every file that has to be optimized and creates the directories they go in
+
+        Arguments:
+        paths -- array of files and directories
+        callback -- function to process each file with
+        extension -- extension to search for in directories
+        minimize -- whether or not we should minimize the file contents (html)
+
+        Returns:
+        list -- tuples of (file, callback name, minimize, new path)
+
+        """
+        tasks = []
         for file in paths:
             if not Util.isDir(file):
-                self.optimizeFile(file, callback, minimize)
+                tasks.append((file, callback.__name__, minimize, None))
                 continue
 
-            self.optimizeDirectory(file, callback, extension, minimize)
+            self.addDirectoryTasks(file, callback, extension, minimize, tasks)
+
+        return tasks
+
+    def getAllOptimizeTasks(self):
+        """gets the optimize tasks for every css, view and js file
+
+        Returns:
+        list
+
+        """
+        tasks = self.getOptimizeTasks(self.config.css, self.optimizeCss)
+        tasks += self.getOptimizeTasks(self.config.views, self.optimizeHtml, self.config.view_extension, self.config.compress_html)
+
+        if self.config.js_manifest is None:
+            tasks += self.getOptimizeTasks(self.config.js, self.optimizeJavascript)
+
+        return tasks
+
+    def runOptimizeTasks(self, tasks):
+        """optimizes a list of files, using the worker pool if there is more than one job
+
+        Arguments:
+        tasks -- list of (file, callback name, minimize, new path) tuples
+
+        Returns:
+        void
+
+        """
+        if self.config.jobs < 2 or len(tasks) < 2:
+            for file, callback, minimize, new_path in tasks:
+                if new_path is None:
+                    new_path = Util.prependExtension("opt", file)
+                self.profileCall("optimize", file, self.optimizeFile, file, getattr(self, callback), minimize, new_path)
+                self.precompressFile(new_path)
+            return
+
+        pool = self.getOptimizePool()
+        chunk_size = max(1, len(tasks) // (self.config.jobs * 4))
+        for file, new_path, sizes, seconds in pool.imap_unordered(workers.optimizeFile, tasks, chunk_size):
+            if sizes is not None:
+                SizeTracker.addFile(file, new_path, sizes[0], sizes[1])
+            if self.profile_hooks:
+                self.callProfileHooks("optimize", file, seconds)
+            self.precompressFile(new_path)
+
+    def getOptimizePool(self):
+        """gets the pool of worker processes used to optimize files
+
+        the pool is created the first time it is needed, after the maps are done,
+        so the maps are only sent to each worker once
+
+        Returns:
+        multiprocessing.Pool
+
+        """
+        if self.optimize_pool is None:
+            self.optimize_pool = multiprocessing.Pool(self.config.jobs, workers.initOptimizeWorker, (self.config, self.class_map, self.id_map, self.used_names))
+
+        return self.optimize_pool
+
+    def closeOptimizePool(self):
+        """shuts down the pool of worker processes used to optimize files
+
+        Returns:
+        void
+
+        """
+        if self.optimize_pool is None:
+            return
+
+        self.optimize_pool.close()
+        self.optimize_pool.join()
+        self.optimize_pool = None
+
+    def precompressFile(self, path):
+        """queues up writing compressed copies of a munched file
+
+        the copies are written by a separate pool of worker processes so
+        compressing one file happens while the next one is being rewritten
+
+        Arguments:
+        path -- path to munched file
+
+        Returns:
+        void
+
+        """
+        if not self.config.precompress:
+            return
+
+        if self.compress_pool is None:
+            self.compress_pool = multiprocessing.Pool(self.config.jobs)
+
+        self.compress_results.append(self.compress_pool.apply_async(workers.compressFile, ((path, self.config.precompress),)))
+
+    def closeCompressPool(self):
+        """waits for all compressed copies to be written and shuts down the pool
+
+        Returns:
+        void
+
+        """
+        if self.compress_pool is None:
+            return
+
+        self.compress_pool.close()
+        try:
+            written = sum(result.get() for result in self.compress_results)
+        finally:
+            self.compress_pool.join()
+            self.compress_pool = None
+
+        skipped = len(self.compress_results) * len(self.config.precompress) - written
+        self.compress_results = []
+        self.output("wrote " + str(written) + " compressed copies (" + str(skipped) + " were already current)")
 
     def optimizeFile(self, file, callback, minimize = False, new_path = None, prepend = "opt"):
         """optimizes a single file
@@ -558,17 +1597,114 @@ class Muncher(object):
         void
 
         """
-        content = callback(file)
         if new_path is None:
             new_path = Util.prependExtension(prepend, file)
+
+        rewriter = self.getStreamRewriter(callback)
+        if rewriter is not None and minimize is False:
+            self.output("streaming " + file + " to " + new_path)
+            chunks = rewriter.rewriteChunks(Util.fileGetChunks(file, self.config.chunk_size))
+            if self.config.minify:
+                chunks = Muncher.minifyChunks(callback, chunks)
+            Util.filePutChunks(new_path, chunks)
+        else:
+            content = self.getOptimizedContents(file, callback, minimize)
+            self.output("optimizing " + file + " to " + new_path)
+
+            # leaving an unchanged file alone keeps its compressed copies current
+            if not Util.fileMatches(new_path, content):
+                Util.filePutContents(new_path, content)
+
+        # every file is only rewritten once
+        self.documents.remove(file)
+
+        if self.track_sizes:
+            SizeTracker.trackFile(file, new_path)
+
+    def getOptimizedContents(self, file, callback, minimize = False):
+        """runs a file through a callback, using the cache if there is one
+
+        Arguments:
+        file -- path to file
+        callback -- function to run the file through
+        minimize -- whether or not we should minimize the file contents (html)
+
+        Returns:
+        string
+
+        """
+        if self.cache is None:
+            return self.runCallback(file, callback, minimize)
+
+        contents = self.documents.getContents(file)
+        key = Cache.getKey("optimize", callback.__name__, str(minimize), self.getMapDigest(), contents)
+        content = self.cache.get(key)
+        if content is None:
+            content = self.runCallback(file, callback, minimize, contents)
+            self.cache.set(key, content)
+
+        return content
+
+    def runCallback(self, file, callback, minimize = False, contents = None):
+        """runs a file through a callback
+
+        Arguments:
+        file -- path to file
+        callback -- function to run the file through
+        minimize -- whether or not we should minimize the file contents (html)
+        contents -- contents of the file if they were already read
+
+        Returns:
+        string
+
+        """
+        content = callback(file, contents)
         if minimize is True:
             self.output("minimizing " + file)
             content = self.minimize(content)
-        self.output("optimizing " + file + " to " + new_path)
-        Util.filePutContents(new_path, content)
 
-        if self.config.show_savings:
-            SizeTracker.trackFile(file, new_path)
+        return content
+
+    def getStreamRewriter(self, callback):
+        """gets the rewriter to stream a file through instead of reading it all into memory
+
+        only standalone css and js files are streamed and only if streaming is turned on
+
+        Arguments:
+        callback -- function the file would be run through
+
+        Returns:
+        CssRewriter|JsRewriter|None
+
+        """
+        if not self.config.stream:
+            return None
+
+        # dropping rules needs the whole stylesheet
+        if callback.__name__ == "optimizeCss" and self.getCssPruner() is None:
+            return self.getCssRewriter()
+
+        if callback.__name__ == "optimizeJavascript":
+            return self.getJsRewriter()
+
+        return None
+
+    @staticmethod
+    def minifyChunks(callback, chunks):
+        """minifies the pieces of a streamed css or js file as they come out of the rewriter
+
+        Arguments:
+        callback -- function the file would be run through
+        chunks -- rewritten pieces of the file
+
+        Returns:
+        generator -- minified pieces
+
+        """
+        if callback.__name__ == "optimizeCss":
+            return CssMinifier.minifyChunks(chunks)
+
+        return JsMinifier.minifyChunks(chunks)
 
     def prepareDirectory(self, path):
         if ".svn" in path:
@@ -582,79 +1718,65 @@ class Muncher(object):
         os.mkdir(path)
         return False
 
-    def optimizeDirectory(self, path, callback, extension = "", minimize = False):
-        """optimizes a directory
+    def addDirectoryTasks(self, path, callback, extension, minimize, tasks, new_path = None):
+        """creates the optimized directory for a directory and adds a task for every file in it
 
         Arguments:
         path -- path to directory
-        callback -- function to run the file through
+        callback -- function to run the files through
         extension -- extension to search for in the directory
         minimize -- whether or not we should minimize the file contents (html)
+        tasks -- list to add the tasks to
+        new_path -- path to the optimized parent directory if this is a subdirectory
 
         Returns:
         void
 
         """
-        directory = path + "_opt"
+        if new_path is None:
+            directory = path + "_opt"
+        else:
+            directory = new_path + "/" + path.split("/").pop()
+
         skip = self.prepareDirectory(directory)
         if skip is True:
             return
 
         for dir_file in Util.getFilesFromDir(path, extension):
             if Util.isDir(dir_file):
-                self.optimizeSubdirectory(dir_file, callback, directory, extension, minimize)
+                self.addDirectoryTasks(dir_file, callback, extension, minimize, tasks, directory)
                 continue
 
-            new_path = directory + "/" + Util.getFileName(dir_file)
-            self.optimizeFile(dir_file, callback, minimize, new_path)
+            tasks.append((dir_file, callback.__name__, minimize, directory + "/" + Util.getFileName(dir_file)))
 
-    def optimizeSubdirectory(self, path, callback, new_path, extension = "", minimize = False):
-        """optimizes a subdirectory within a directory being optimized
+    def minimize(self, content):
+        """minifies html without touching pre, textarea, script or style contents
 
         Arguments:
-        path -- path to directory
-        callback -- function to run the file through
-        new_path -- path to optimized parent directory
-        extension -- extension to search for in the directory
-        minimize -- whether or not we should minimize the file contents (html)
+        content -- html to minify
 
         Returns:
-        void
+        string
 
         """
-        subdir_path = new_path + "/" + path.split("/").pop()
-        skip = self.prepareDirectory(subdir_path)
-        if skip is True:
-            return
-
-        for dir_file in Util.getFilesFromDir(path, extension):
-            if Util.isDir(dir_file):
-                self.optimizeSubdirectory(dir_file, callback, subdir_path, extension, minimize)
-                continue
-
-            new_file_path = subdir_path + "/" + Util.getFileName(dir_file)
-            self.optimizeFile(dir_file, callback, minimize, new_file_path)
+        return HtmlMinifier.minify(content)
 
-    def minimize(self, content):
-        content = re.sub(r'\n', '', content)
-        content = re.sub(r'\s\s+', '', content)
-        content = re.sub(r'(<!--(?!\[if)(.*?)-->)', '', content, re.MULTILINE)
-        return content
-
-    def optimizeCss(self, path):
+    def optimizeCss(self, path, css = None):
         """replaces classes and ids with new values in a css file
 
         Arguments:
         path -- string path to css file to optimize
+        css -- contents of the file if they were already read
 
         Returns:
         string
 
         """
-        css = Util.fileGetContents(path)
-        return self.replaceCss(css)
+        if css is None:
+            css = self.documents.getContents(path)
+        return self.replaceCss(css, self.config.minify)
 
-    def optimizeHtml(self, path):
+    def optimizeHtml(self, path, html = None):
         """replaces classes and ids with new values in an html file
 
         Uses:
@@ -662,17 +1784,16 @@ class Muncher(object):
 
         Arguments:
         path -- string path to file to optimize
+        html -- contents of the file if they were already read
 
         Returns:
         string
 
         """
-        html = Util.fileGetContents(path)
-        html = self.replaceHtml(html)
-        html = self.optimizeCssBlocks(html)
-        html = self.optimizeJavascriptBlocks(html)
+        if html is None:
+            html = self.documents.getContents(path)
 
-        return html
+        return self.rewriteSegments(self.getViewSegments(path, html))
 
     def replaceHtml(self, html):
         """replaces classes and ids with new values in an html file
@@ -684,93 +1805,73 @@ class Muncher(object):
         string
 
         """
-        html = self.replaceHtmlIds(html)
-        html = self.replaceHtmlClasses(html)
-        return html
-
-    def replaceHtmlIds(self, html):
-        """replaces any instances of ids in html markup
+        return self.getHtmlRewriter().rewrite(html)
 
-        Arguments:
-        html -- contents of file to replaces ids in
+    def getHtmlRewriter(self):
+        """gets the rewriter used for html markup built from the current class and id maps
 
         Returns:
-        string
+        HtmlRewriter
 
         """
-        for key, value in self.id_map.items():
-            key = key[1:]
-            value = value[1:]
-            html = html.replace("id=\"" + key + "\"", "id=\"" + value + "\"")
+        if self.html_rewriter is None:
+            self.html_rewriter = HtmlRewriter(self.class_map, self.id_map)
 
-        return html
+        return self.html_rewriter
 
-    def replaceClassBlock(self, class_block, key, value):
-        """replaces a class string with the new class name
+    def rewriteSegments(self, segments):
+        """rewrites the segments of a view and puts them back together
+
+        class and id attributes are rewritten everywhere, style blocks are also
+        rewritten as css and script blocks as javascript.  markup between the
+        blocks is rewritten in one go.  the blocks are minified as well with
+        --minify or --compress-html.
 
         Arguments:
-        class_block -- string from what would be found within class="{class_block}"
-        key -- current class
-        value -- new class
+        segments -- list of (type, text) from getSegments
 
         Returns:
         string
 
         """
-        key_length = len(key)
-        classes = class_block.split(" ")
-        i = 0
-        for class_name in classes:
-            if class_name == key:
-                classes[i] = value
-
-            # allows support for things like a.class_name as one of the js selectors
-            elif key[0] in (".", "#") and class_name[-key_length:] == key:
-                classes[i] = class_name.replace(key, value)
-            i = i + 1
-
-        return " ".join(classes)
-
-    def replaceHtmlClasses(self, html):
-        """replaces any instances of classes in html markup
+        parts = []
+        markup = []
+        minify = self.config.minify or self.config.compress_html
+        for type, text in segments:
+            if type != "style" and type != "script":
+                markup.append(text)
+                continue
 
-        Arguments:
-        html -- contents of file to replace classes in
+            # the markup before a block ends with its opening tag
+            opening = markup[-1] if markup else ""
+            if markup:
+                parts.append(self.replaceHtml("".join(markup)))
+                markup = []
 
-        Returns:
-        string
+            text = self.replaceHtml(text)
+            if type == "style":
+                text = self.replaceCss(text, minify)
+            else:
+                text = self.replaceJavascript(text, minify and Muncher.isJavascriptBlock(opening))
+            parts.append(text)
 
-        """
-        for key, value in self.class_map.items():
-            key = key[1:]
-            value = value[1:]
-            class_blocks = re.findall(r'class\=((\'|\")(.*?)(\'|\"))', html)
-            for class_block in class_blocks:
-                new_block = self.replaceClassBlock(class_block[2], key, value)
-                html = html.replace("class=" + class_block[0], "class=" + class_block[1] + new_block + class_block[3])
+        if markup:
+            parts.append(self.replaceHtml("".join(markup)))
 
-        return html
+        return "".join(parts)
 
-    def optimizeCssBlocks(self, html):
-        """rewrites css blocks that are part of an html file
+    @staticmethod
+    def getSegments(html):
+        """splits html into markup, style blocks and script blocks
 
         Arguments:
-        html -- contents of file we are replacing
+        html -- contents of a view
 
         Returns:
-        string
+        list -- tuples of (type, text) where type is "markup", "style" or "script"
 
         """
-        result_css = ""
-        matches = self.getCssBlocks(html)
-        for match in matches:
-            match = self.replaceCss(match)
-            result_css = result_css + match
-
-        if len(matches):
-            return html.replace(matches[0], result_css)
-
-        return html
+        return HtmlSegmenter.getSegments(html)
 
     @staticmethod
     def getCssBlocks(html):
@@ -783,73 +1884,62 @@ class Muncher(object):
         list
 
         """
-        return re.compile(r'\<style.*?\>(.*)\<\/style\>', re.DOTALL).findall(html)
+        return [text for type, text in Muncher.getSegments(html) if type == "style"]
 
-    def replaceCss(self, css):
+    def replaceCss(self, css, minify = False):
         """single call to handle replacing ids and classes
 
         Arguments:
         css -- contents of file to replace
+        minify -- whether or not to strip comments and whitespace as well
 
         Returns:
         string
 
         """
-        css = self.replaceCssFromDictionary(self.class_map, css)
-        css = self.replaceCssFromDictionary(self.id_map, css)
-        return css
+        pruner = self.getCssPruner()
+        if pruner is not None:
+            css = pruner.prune(css)
 
-    def replaceCssFromDictionary(self, dictionary, css):
-        """replaces any instances of classes and ids based on a dictionary
+        if minify:
+            return CssMinifier.minify(self.getCssRewriter().rewrite(css))
 
-        Arguments:
-        dictionary -- map of classes or ids to replace
-        css -- contents of css to replace
+        return self.getCssRewriter().rewrite(css)
+
+    def getCssRewriter(self):
+        """gets the rewriter used for css built from the current class and id maps
 
         Returns:
-        string
+        CssRewriter
 
         """
-        # this really should be done better
-        for key, value in dictionary.items():
-            css = css.replace(key + "{", value + "{")
-            css = css.replace(key + " {", value + " {")
-            css = css.replace(key + "#", value + "#")
-            css = css.replace(key + " #", value + " #")
-            css = css.replace(key + ".", value + ".")
-            css = css.replace(key + " .", value + " .")
-            css = css.replace(key + ",", value + ",")
-            css = css.replace(key + " ", value + " ")
-            css = css.replace(key + ":", value + ":")
-            # if key == ".svg":
-                # print "replacing " + key + " with " + value
+        if self.css_rewriter is None:
+            dictionary = dict(self.class_map)
+            dictionary.update(self.id_map)
+            self.css_rewriter = CssRewriter(dictionary)
 
-        return css
+        return self.css_rewriter
 
-    def optimizeJavascriptBlocks(self, html):
-        """rewrites javascript blocks that are part of an html file
+    @staticmethod
+    def isJavascriptBlock(markup):
+        """checks if the script block opened at the end of some markup contains javascript
+
+        blocks such as <script type="text/template"> are left alone when minifying
 
         Arguments:
-        html -- contents of file we are replacing
+        markup -- markup ending with the opening script tag
 
         Returns:
-        string
+        bool
 
         """
-        matches = self.getJsBlocks(html)
-
-        for match in matches:
-            new_js = match
-            if self.config.compress_html:
-                matches = re.findall(r'((:?)\/\/.*?\n|\/\*.*?\*\/)', new_js, re.DOTALL)
-                for single_match in matches:
-                    if single_match[1] == ':':
-                        continue
-                    new_js = new_js.replace(single_match[0], '');
-            new_js = self.replaceJavascript(new_js)
-            html = html.replace(match, new_js)
+        tag = markup[markup.lower().rfind("<script"):]
+        match = re.search(r'''\stype\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', tag, re.IGNORECASE)
+        if match is None:
+            return True
 
-        return html
+        type = (match.group(1) or match.group(2) or match.group(3) or "").strip().lower()
+        return type in ("", "module", "text/javascript", "application/javascript", "text/ecmascript", "application/ecmascript", "application/x-javascript")
 
     @staticmethod
     def getJsBlocks(html):
@@ -862,82 +1952,47 @@ class Muncher(object):
         list
 
         """
-        return re.compile(r'\<script(?! src).*?\>(.*?)\<\/script\>', re.DOTALL).findall(html)
+        return [text for type, text in Muncher.getSegments(html) if type == "script"]
 
-    def optimizeJavascript(self, path):
+    def optimizeJavascript(self, path, js = None):
         """optimizes javascript for a specific file
 
         Arguments:
         path -- path to js file on disk that we are optimizing
+        js -- contents of the file if they were already read
 
         Returns:
         string -- contents to replace file with
 
         """
-        js = Util.fileGetContents(path)
-        return self.replaceJavascript(js)
+        if js is None:
+            js = self.documents.getContents(path)
+        return self.replaceJavascript(js, self.config.minify)
 
-    def replaceJavascript(self, js):
+    def replaceJavascript(self, js, minify = False):
         """single call to handle replacing ids and classes
 
         Arguments:
         js -- contents of file to replace
+        minify -- whether or not to strip comments and whitespace as well
 
         Returns:
         string
 
         """
-        js = self.replaceJsFromDictionary(self.id_map, js)
-        js = self.replaceJsFromDictionary(self.class_map, js)
-        return js
-
-    @staticmethod
-    def getJsSelectors(js, config):
-        """finds all js selectors within a js block
-
-        Arguments:
-        js -- contents of js file to search
-
-        Returns:
-        list
-
-        """
-        valid_selectors = "|".join(config.custom_selectors) + "|" + "|".join(config.id_selectors) + "|" + "|".join(config.class_selectors)
-        valid_selectors = valid_selectors.replace('$', '\$')
-        return re.findall(r'(' + valid_selectors + ')(\(([^<>]*?)\))', js, re.DOTALL)
+        if minify:
+            return JsMinifier.minify(self.getJsRewriter().rewrite(js))
 
-    def replaceJsFromDictionary(self, dictionary, js):
-        """replaces any instances of classes and ids based on a dictionary
+        return self.getJsRewriter().rewrite(js)
 
-        Arguments:
-        dictionary -- map of classes or ids to replace
-        js -- contents of javascript to replace
+    def getJsRewriter(self):
+        """gets the rewriter used for javascript built from the current class and id maps
 
         Returns:
-        string
+        JsRewriter
 
         """
-        for key, value in dictionary.items():
-            blocks = self.getJsSelectors(js, self.config)
-            for block in blocks:
-                if key[0] == "#" and block[0] in self.config.class_selectors:
-                    continue
-
-                if key[0] == "." and block[0] in self.config.id_selectors:
-                    continue
-
-                old_selector = block[0] + block[1]
-
-                # custom selectors
-                if block[0] in self.config.custom_selectors:
-                    new_selector = old_selector.replace(key + ".", value + ".")
-                    new_selector = new_selector.replace(key + " ", value + " ")
-                    new_selector = new_selector.replace(key + "\"", value + "\"")
-                    new_selector = new_selector.replace(key + "\'", value + "\'")
-                else:
-                    new_selector = old_selector.replace("'" + key[1:] + "'", "'" + value[1:] + "'")
-                    new_selector = new_selector.replace("\"" + key[1:] + "\"", "\"" + value[1:] + "\"")
-
-                js = js.replace(old_selector, new_selector)
+        if self.js_rewriter is None:
+            self.js_rewriter = JsRewriter(self.config, self.class_map, self.id_map)
 
-        return js
+        return self.js_rewriter
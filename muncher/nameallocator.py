@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import fnmatch
+from varfactory import VarFactory
+
+class NameAllocator(object):
+    """hands out short class or id names while skipping reserved and blocked ones"""
+
+    # adblock extensions may hide elements with these names so we should never generate them
+    default_blocklist = ("ad",)
+
+    def __init__(self, prefix, reserved = (), blocklist = (), lowercase = False):
+        """constructor
+
+        Arguments:
+        prefix -- either "." for classes or "#" for ids
+        reserved -- names (with prefix) that can never be handed out
+        blocklist -- extra words (without prefix) that can never be handed out
+        lowercase -- only hand out lowercase names
+
+        Returns:
+        void
+
+        """
+        self.prefix = prefix
+        self.lowercase = lowercase
+        self.index = 0
+        self.reserved = set()
+        self.patterns = []
+        self.blocked = set()
+        self.reserve(reserved)
+        self.addBlocklist(self.default_blocklist)
+        self.addBlocklist(blocklist)
+
+    def reserve(self, names):
+        """marks names as taken so they are never handed out
+
+        Arguments:
+        names -- list of names with prefix
+
+        Returns:
+        void
+
+        """
+        self.reserved.update(names)
+
+    def reservePatterns(self, patterns):
+        """marks every name that matches a pattern as taken
+
+        Arguments:
+        patterns -- list of fnmatch patterns with prefix
+
+        Returns:
+        void
+
+        """
+        self.patterns.extend(patterns)
+
+    def addBlocklist(self, words):
+        """adds words that should never be used as a name
+
+        Arguments:
+        words -- list of words without prefix
+
+        Returns:
+        void
+
+        """
+        for word in words:
+            self.blocked.add(word.lower())
+
+    def isAvailable(self, name):
+        """checks if a name (with prefix) can be handed out
+
+        Arguments:
+        name -- name to check
+
+        Returns:
+        bool
+
+        """
+        if name in self.reserved or name[1:].lower() in self.blocked:
+            return False
+
+        for pattern in self.patterns:
+            if fnmatch.fnmatchcase(name, pattern):
+                return False
+
+        return True
+
+    def getNext(self):
+        """gets the next available name
+
+        Returns:
+        string
+
+        """
+        while True:
+            name = self.prefix + VarFactory.getSmallName(self.index, self.lowercase)
+            self.index += 1
+            if self.isAvailable(name):
+                return name
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+from htmlrewriter import HtmlRewriter
+
+class NameClusterer(object):
+    """hands out new names so that names used together end up looking alike
+
+    names that show up in the same css selector or the same class attribute
+    are counted as pairs.  within each group of new names that have the same
+    length the names are then reordered so that names used together get
+    neighboring new names (aa, ab, ac...) which share characters that deflate
+    can pick up on.  the length of every new name stays the same so the raw
+    savings do not change.
+    """
+    comment_regex = re.compile(r'/\*.*?\*/', re.DOTALL)
+    selector_regex = re.compile(r'([^{};]+)\{')
+    name_regex = re.compile(r'[.#][\w-]+')
+
+    # a huge group would add a pair for every two names in it without saying much
+    max_group_size = 16
+
+    def __init__(self):
+        """constructor
+
+        Returns:
+        void
+
+        """
+        self.pairs = {}
+
+    def addGroup(self, names):
+        """counts every two names in a group as being used together
+
+        Arguments:
+        names -- names with prefix that were used together
+
+        Returns:
+        void
+
+        """
+        names = sorted(set(names))[:self.max_group_size]
+        for i, name in enumerate(names):
+            neighbors = self.pairs.setdefault(name, {})
+            for other in names[i + 1:]:
+                neighbors[other] = neighbors.get(other, 0) + 1
+                other_neighbors = self.pairs.setdefault(other, {})
+                other_neighbors[name] = other_neighbors.get(name, 0) + 1
+
+    def addCss(self, css):
+        """counts names that are used in the same selector
+
+        Arguments:
+        css -- css contents
+
+        Returns:
+        void
+
+        """
+        css = self.comment_regex.sub("", css)
+        for match in self.selector_regex.finditer(css):
+            names = self.name_regex.findall(match.group(1))
+            if len(names) > 1:
+                self.addGroup(names)
+
+    def addHtml(self, html):
+        """counts classes that are used in the same class attribute
+
+        Arguments:
+        html -- html contents
+
+        Returns:
+        void
+
+        """
+        for match in HtmlRewriter.attribute_regex.finditer(html):
+            if match.group(1).lower() != "class":
+                continue
+
+            value = match.group(3) if match.group(3) is not None else match.group(4)
+            names = ["." + name for name in value.split()]
+            if len(names) > 1:
+                self.addGroup(names)
+
+    def addContents(self, type, contents):
+        """counts names used together in a document
+
+        Arguments:
+        type -- "css", "view" or "js"
+        contents -- contents of the document
+
+        Returns:
+        void
+
+        """
+        if type == "css":
+            self.addCss(contents)
+        elif type == "view":
+            self.addHtml(contents)
+
+    def getOrder(self, names):
+        """orders names so that names used together come right after each other
+
+        starting with the name that saves the most, the next name is always the
+        one used most often with the name before it, or the name that saves the
+        most if none of the names left were used with it
+
+        Arguments:
+        names -- names in order of savings
+
+        Returns:
+        list
+
+        """
+        left = set(names)
+        order = []
+        next_index = 0
+        while left:
+            best = None
+            if order:
+                best_count = 0
+                for other, count in self.pairs.get(order[-1], {}).iteritems():
+                    if other in left and (count > best_count or (count == best_count and other < best)):
+                        best = other
+                        best_count = count
+
+            if best is None:
+                while names[next_index] not in left:
+                    next_index += 1
+                best = names[next_index]
+
+            order.append(best)
+            left.remove(best)
+
+        return order
+
+    def getNameMap(self, name_map, names):
+        """reorders new names within each name length so names used together get neighboring names
+
+        Arguments:
+        name_map -- dictionary of names to new names
+        names -- names that are allowed to change, in the order they were given new names
+
+        Returns:
+        dict
+
+        """
+        tiers = {}
+        for name in names:
+            tiers.setdefault(len(name_map[name]), []).append(name)
+
+        new_map = dict(name_map)
+        for tier in tiers.itervalues():
+            new_names = [name_map[name] for name in tier]
+            for name, new_name in zip(self.getOrder(tier), new_names):
+                new_map[name] = new_name
+
+        return new_map
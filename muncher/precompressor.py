@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os, hashlib, tempfile
+from util import Util
+from sizetracker import SizeTracker
+
+class Precompressor(object):
+    """writes compressed copies of munched files next to them
+
+    web servers such as nginx with gzip_static can send file.css.gz as is
+    instead of compressing file.css on every request.  every copy gets the same
+    modified time as the file it was made from so a copy that is still current
+    can be skipped next time.  a file rewritten within the same timestamp tick
+    keeps its modified time, so a copy is only skipped once its contents were
+    checked as well.
+    """
+    extensions = {"gzip": ".gz", "bz2": ".bz2", "lzma": ".xz"}
+
+    # nobody is waiting on these so use the smallest output
+    level = 9
+
+    @staticmethod
+    def getCompressorName(name):
+        """turns a compressor or file extension name into the name SizeTracker uses
+
+        Arguments:
+        name -- gzip, gz, bz2, lzma or xz
+
+        Returns:
+        string|None
+
+        """
+        name = name.strip().lower()
+        if name in ("gzip", "gz"):
+            return "gzip"
+        if name == "bz2":
+            return "bz2"
+        if name in ("lzma", "xz"):
+            return "lzma"
+        return None
+
+    @staticmethod
+    def getPath(path, name):
+        """gets the path of the compressed copy of a file
+
+        Arguments:
+        path -- path to file
+        name -- name of compressor
+
+        Returns:
+        string
+
+        """
+        return path + Precompressor.extensions[name]
+
+    @staticmethod
+    def isCurrent(path, compressed_path, name):
+        """checks if a compressed copy was made from the current version of a file
+
+        Arguments:
+        path -- path to file
+        compressed_path -- path to compressed copy
+        name -- name of compressor
+
+        Returns:
+        bool
+
+        """
+        try:
+            difference = os.stat(compressed_path).st_mtime - os.stat(path).st_mtime
+        except OSError:
+            return False
+
+        # os.utime() only keeps microseconds
+        if abs(difference) >= 0.000002:
+            return False
+
+        # timestamps can be as coarse as a second so the same modified time
+        # does not mean the same contents
+        digest = hashlib.sha1()
+        for chunk in Util.fileGetChunks(path, 64 * 1024):
+            digest.update(chunk)
+
+        compressed_digest = hashlib.sha1()
+        decompressor = SizeTracker.getDecompressor(name)
+        try:
+            for chunk in Util.fileGetChunks(compressed_path, 64 * 1024):
+                compressed_digest.update(decompressor.decompress(chunk))
+        except Exception:
+            # a copy that cannot be decompressed is never current
+            return False
+
+        return digest.digest() == compressed_digest.digest()
+
+    @staticmethod
+    def compressFile(path, names):
+        """writes compressed copies of a file unless they are already current
+
+        Arguments:
+        path -- path to file
+        names -- list of compressor names
+
+        Returns:
+        int -- number of copies written
+
+        """
+        written = 0
+        for name in names:
+            compressed_path = Precompressor.getPath(path, name)
+            if Precompressor.isCurrent(path, compressed_path, name):
+                continue
+
+            Precompressor.writeCompressed(path, compressed_path, name)
+            written += 1
+
+        return written
+
+    @staticmethod
+    def writeCompressed(path, compressed_path, name):
+        """streams a file through a compressor into its compressed copy
+
+        the copy is written to a temporary file first so a server never sends half of it
+
+        Arguments:
+        path -- path to file
+        compressed_path -- path to write the compressed copy to
+        name -- name of compressor
+
+        Returns:
+        void
+
+        """
+        stat = os.stat(path)
+        compressor = SizeTracker.getCompressor(name, Precompressor.level)
+        fd, temp_path = tempfile.mkstemp(dir = os.path.dirname(compressed_path) or ".")
+        try:
+            file = os.fdopen(fd, "wb")
+            try:
+                for chunk in Util.fileGetChunks(path, 64 * 1024):
+                    file.write(compressor.compress(chunk))
+                file.write(compressor.flush())
+            finally:
+                file.close()
+
+            os.chmod(temp_path, stat.st_mode & 0777)
+            os.utime(temp_path, (stat.st_atime, stat.st_mtime))
+            os.rename(temp_path, compressed_path)
+        except:
+            Util.unlink(temp_path)
+            raise
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import timeit
+from sizetracker import SizeTracker
+
+class Profiler(object):
+    """collects timings from Muncher profile hooks and reports on them
+
+    every phase of a run and every file that gets searched or rewritten is
+    reported to the hooks added with Muncher.addProfileHook.  this class is
+    the hook used by --profile.
+    """
+
+    # the most precise wall clock timer on this platform
+    timer = staticmethod(timeit.default_timer)
+
+    def __init__(self):
+        """constructor
+
+        Returns:
+        void
+
+        """
+        self.phases = []
+        self.files = []
+
+    def record(self, kind, name, seconds, size):
+        """profile hook that remembers a timing
+
+        Arguments:
+        kind -- "phase", "scan" or "optimize"
+        name -- name of the phase or path to the file
+        seconds -- how long it took
+        size -- size of the file in bytes (None for phases)
+
+        Returns:
+        void
+
+        """
+        if kind == "phase":
+            self.phases.append((name, seconds))
+            return
+
+        self.files.append((seconds, kind, name, size))
+
+    def getReport(self, count = 10):
+        """gets the time per phase and the slowest files
+
+        Arguments:
+        count -- how many of the slowest files to show
+
+        Returns:
+        string
+
+        """
+        total = sum(seconds for name, seconds in self.phases)
+        string = "\ntime per phase:"
+        for name, seconds in self.phases:
+            percent = seconds / total * 100 if total > 0 else 0.0
+            string += "\n    %-12s %9.2f ms %6.1f%%" % (name, seconds * 1000, percent)
+        string += "\n    %-12s %9.2f ms" % ("total", total * 1000)
+
+        if self.files:
+            string += "\n\nslowest files:"
+            for seconds, kind, path, size in sorted(self.files, reverse = True)[:count]:
+                string += "\n    %9.2f ms  %-8s %10s  %s" % (seconds * 1000, kind, SizeTracker.getSize(size or 0), path)
+
+        return string + "\n"
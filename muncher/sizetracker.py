@@ -13,42 +13,203 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import sys, os, gzip
+import zlib, json
 from util import Util
 
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
 class SizeTracker(object):
-    original_size = 0
-    original_size_gzip = 0
-    new_size = 0
-    new_size_gzip = 0
+    """keeps track of how big files are before and after munching
+
+    sizes are measured by streaming each file through compressors in memory so
+    nothing extra is ever written to disk.  gzip is always measured, bz2 and
+    lzma can be added if this python has support for them.
+    """
+    compressors = ["gzip"]
+    level = 9
+    original_sizes = {}
+    new_sizes = {}
+    files = []
+    name_sizes = None
 
     @staticmethod
-    def addSize(path, new = False):
+    def isAvailable(name):
+        """checks if a compressor can be used with this python
 
-        # gzip the file to get that size
-        gzip_path = path + '.gz'
-        f_in = open(path, 'rb')
-        f_out = gzip.open(gzip_path, 'wb')
-        f_out.writelines(f_in)
-        f_out.close()
-        f_in.close()
+        Arguments:
+        name -- name of compressor (gzip, bz2 or lzma)
 
-        size = os.path.getsize(path)
-        gzip_size = os.path.getsize(gzip_path)
+        Returns:
+        bool
+
+        """
+        if name == "gzip":
+            return True
+        if name == "bz2":
+            return bz2 is not None
+        if name == "lzma":
+            return lzma is not None
+        return False
+
+    @staticmethod
+    def configure(compressors, level):
+        """sets which compressors to measure and how hard they should try
 
-        if new is False:
-            SizeTracker.original_size += size
-            SizeTracker.original_size_gzip += gzip_size
-        else:
-            SizeTracker.new_size += size
-            SizeTracker.new_size_gzip += gzip_size
+        Arguments:
+        compressors -- list of compressor names, the first one is used for budgets
+        level -- compression level from 1 to 9
 
-        Util.unlink(gzip_path)
+        Returns:
+        void
+
+        """
+        SizeTracker.compressors = [name for name in compressors if SizeTracker.isAvailable(name)]
+        SizeTracker.level = level
+
+    @staticmethod
+    def getCompressor(name, level = None):
+        """gets a new compressor object
+
+        Arguments:
+        name -- name of compressor
+        level -- compression level (defaults to the level savings are measured with)
+
+        Returns:
+        object with compress() and flush() methods
+
+        """
+        if level is None:
+            level = SizeTracker.level
+
+        if name == "bz2":
+            return bz2.BZ2Compressor(level)
+        if name == "lzma":
+            return lzma.LZMACompressor(preset = level)
+
+        # a window size of 31 makes zlib write a gzip header and trailer
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    @staticmethod
+    def getDecompressor(name):
+        """gets a new decompressor object
+
+        Arguments:
+        name -- name of compressor
+
+        Returns:
+        object with a decompress() method
+
+        """
+        if name == "bz2":
+            return bz2.BZ2Decompressor()
+        if name == "lzma":
+            return lzma.LZMADecompressor()
+
+        # a window size of 31 makes zlib expect a gzip header and trailer
+        return zlib.decompressobj(31)
+
+    @staticmethod
+    def getSizes(path):
+        """gets the size of a file and the size it would be compressed
+
+        Arguments:
+        path -- path to file on disk
+
+        Returns:
+        dict -- "size" and the compressed size for every compressor
+
+        """
+        compressors = [(name, SizeTracker.getCompressor(name)) for name in SizeTracker.compressors]
+        sizes = dict((name, 0) for name, compressor in compressors)
+        sizes["size"] = 0
+
+        for chunk in Util.fileGetChunks(path, 64 * 1024):
+            sizes["size"] += len(chunk)
+            for name, compressor in compressors:
+                sizes[name] += len(compressor.compress(chunk))
+
+        for name, compressor in compressors:
+            sizes[name] += len(compressor.flush())
+
+        return sizes
+
+    @staticmethod
+    def getGzipSize(contents):
+        """gets the gzipped size of a string
+
+        Arguments:
+        contents -- string to compress
+
+        Returns:
+        int
+
+        """
+        compressor = SizeTracker.getCompressor("gzip")
+        return len(compressor.compress(contents)) + len(compressor.flush())
+
+    @staticmethod
+    def setNameSizes(files, default_size, new_size):
+        """records how gzip-aware names did compared to the default names
+
+        Arguments:
+        files -- number of files in the sample
+        default_size -- gzipped size of the sample with the default names
+        new_size -- gzipped size of the sample with gzip-aware names
+
+        Returns:
+        void
+
+        """
+        SizeTracker.name_sizes = {"sample_files": files, "default": default_size, "gzip_aware": new_size, "delta": new_size - default_size}
+
+    @staticmethod
+    def addSizes(sizes, new = False):
+        """adds sizes measured with getSizes to the totals
+
+        Arguments:
+        sizes -- dict returned by getSizes
+        new -- whether these are the sizes of a munched file
+
+        Returns:
+        void
+
+        """
+        totals = SizeTracker.new_sizes if new else SizeTracker.original_sizes
+        for name, size in sizes.iteritems():
+            totals[name] = totals.get(name, 0) + size
+
+    @staticmethod
+    def addFile(path, new_path, original_sizes, new_sizes):
+        """records the sizes of a file and its munched version
+
+        Arguments:
+        path -- path to original file
+        new_path -- path to munched file
+        original_sizes -- dict returned by getSizes for the original file
+        new_sizes -- dict returned by getSizes for the munched file
+
+        Returns:
+        void
+
+        """
+        SizeTracker.addSizes(original_sizes)
+        SizeTracker.addSizes(new_sizes, True)
+        SizeTracker.files.append({"file": path, "output": new_path, "original": original_sizes, "munched": new_sizes})
 
     @staticmethod
     def trackFile(path, new_path):
-        SizeTracker.addSize(path)
-        SizeTracker.addSize(new_path, True)
+        SizeTracker.addFile(path, new_path, SizeTracker.getSizes(path), SizeTracker.getSizes(new_path))
 
     @staticmethod
     def getSize(bytes):
@@ -59,12 +220,118 @@ class SizeTracker(object):
         kb = round(kb, 2)
         return str(kb) + " KB"
 
+    @staticmethod
+    def getPercent(new_size, original_size):
+        """gets how many percent smaller the new size is
+
+        Arguments:
+        new_size -- size after munching
+        original_size -- size before munching
+
+        Returns:
+        float
+
+        """
+        if original_size == 0:
+            return 0.0
+
+        return round(100 - (float(new_size) / float(original_size)) * 100, 2)
+
+    @staticmethod
+    def getCompressedSizes(sizes):
+        """gets a description of the compressed sizes
+
+        Arguments:
+        sizes -- dict of sizes
+
+        Returns:
+        string
+
+        """
+        parts = []
+        for name in SizeTracker.compressors:
+            label = "gzipped" if name == "gzip" else name
+            parts.append(SizeTracker.getSize(sizes.get(name, 0)) + " " + label)
+
+        return ", ".join(parts)
+
     @staticmethod
     def savings():
-        percent = 100 - (float(SizeTracker.new_size) / float(SizeTracker.original_size)) * 100
-        gzip_percent = 100 - (float(SizeTracker.new_size_gzip) / float(SizeTracker.original_size_gzip)) * 100
+        original = SizeTracker.original_sizes
+        new = SizeTracker.new_sizes
+        percents = []
+        for name in SizeTracker.compressors:
+            label = "gzipped" if name == "gzip" else name
+            percents.append(str(SizeTracker.getPercent(new.get(name, 0), original.get(name, 0))) + "% off the " + label + " size")
 
-        string = "\noriginal size:   " + SizeTracker.getSize(SizeTracker.original_size) + " (" + SizeTracker.getSize(SizeTracker.original_size_gzip) + " gzipped)"
-        string += "\nmunched size:    " + SizeTracker.getSize(SizeTracker.new_size) + " (" + SizeTracker.getSize(SizeTracker.new_size_gzip) + " gzipped)"
-        string += "\n                 saved " + str(round(percent, 2)) + "% off the original size (" + str(round(gzip_percent, 2)) + "% off the gzipped size)\n"
+        string = "\noriginal size:   " + SizeTracker.getSize(original.get("size", 0)) + " (" + SizeTracker.getCompressedSizes(original) + ")"
+        string += "\nmunched size:    " + SizeTracker.getSize(new.get("size", 0)) + " (" + SizeTracker.getCompressedSizes(new) + ")"
+        string += "\n                 saved " + str(SizeTracker.getPercent(new.get("size", 0), original.get("size", 0))) + "% off the original size (" + ", ".join(percents) + ")\n"
         return string
+
+    @staticmethod
+    def getBudgetSize(sizes):
+        """gets the size that budgets are checked against
+
+        this is the size with the first compressor since that is what gets sent over the wire
+
+        Arguments:
+        sizes -- dict of sizes
+
+        Returns:
+        int
+
+        """
+        if not SizeTracker.compressors:
+            return sizes.get("size", 0)
+
+        return sizes.get(SizeTracker.compressors[0], 0)
+
+    @staticmethod
+    def getBudgetErrors(file_budget = None, total_budget = None):
+        """gets every munched file and total that is over budget
+
+        Arguments:
+        file_budget -- maximum bytes for any single file
+        total_budget -- maximum bytes for all files together
+
+        Returns:
+        list -- error messages
+
+        """
+        errors = []
+        if file_budget is not None:
+            for entry in sorted(SizeTracker.files, key = lambda entry: entry["file"]):
+                size = SizeTracker.getBudgetSize(entry["munched"])
+                if size > file_budget:
+                    errors.append(entry["output"] + " is " + SizeTracker.getSize(size) + " which is over the budget of " + SizeTracker.getSize(file_budget))
+
+        if total_budget is not None:
+            size = SizeTracker.getBudgetSize(SizeTracker.new_sizes)
+            if size > total_budget:
+                errors.append("all files together are " + SizeTracker.getSize(size) + " which is over the budget of " + SizeTracker.getSize(total_budget))
+
+        return errors
+
+    @staticmethod
+    def saveReport(path):
+        """saves the sizes of every file as json
+
+        Arguments:
+        path -- path to save the report to
+
+        Returns:
+        void
+
+        """
+        report = {
+            "compressors": SizeTracker.compressors,
+            "level": SizeTracker.level,
+            "files": sorted(SizeTracker.files, key = lambda entry: entry["file"]),
+            "total": {"original": SizeTracker.original_sizes, "munched": SizeTracker.new_sizes}
+        }
+
+        if SizeTracker.name_sizes is not None:
+            report["names"] = SizeTracker.name_sizes
+
+        Util.filePutContents(path, json.dumps(report, indent = 2, sort_keys = True) + "\n")
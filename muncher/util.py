@@ -13,7 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import os, shutil, glob
+import os, re, shutil, glob
 
 class Util:
     """collection of various utility functions"""
@@ -102,7 +102,7 @@ class Util:
 
     @staticmethod
     def getFileName(path):
-        return path.replace(Util.getBasePath(path), "").lstrip("/")
+        return os.path.basename(path)
 
     @staticmethod
     def unlink(path):
@@ -169,6 +169,150 @@ class Util:
         file.write(contents)
         file.close()
 
+    @staticmethod
+    def fileMatches(path, contents):
+        """checks if a file on disk already has exactly these contents
+
+        Arguments:
+        path -- path to file
+        contents -- contents to compare with
+
+        Returns:
+        bool
+
+        """
+        try:
+            if os.path.getsize(path) != len(contents):
+                return False
+        except OSError:
+            return False
+
+        return Util.fileGetContents(path) == contents
+
+    @staticmethod
+    def fileGetChunks(path, chunk_size):
+        """reads a file in pieces so the whole thing never has to be in memory
+
+        Arguments:
+        path -- path to file on disk
+        chunk_size -- how many bytes to read at a time
+
+        Returns:
+        generator
+
+        """
+        file = open(path, "r")
+        try:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            file.close()
+
+    @staticmethod
+    def filePutChunks(path, chunks):
+        """writes pieces of content to a file as they come in
+
+        Arguments:
+        path -- path to file to write to
+        chunks -- iterable of strings to write
+
+        Returns:
+        void
+
+        """
+        file = open(path, "w")
+        try:
+            for chunk in chunks:
+                file.write(chunk)
+        finally:
+            file.close()
+
+    @staticmethod
+    def splitChunks(chunks, delimiters):
+        """splits pieces of text again so every piece ends right after one of the delimiters
+
+        whatever comes after the last delimiter in a chunk is carried over to the next one
+
+        Arguments:
+        chunks -- iterable of consecutive pieces of text
+        delimiters -- string of characters that are safe to split after
+
+        Returns:
+        generator
+
+        """
+        carry = ""
+        for chunk in chunks:
+            text = carry + chunk
+            stop = max([text.rfind(delimiter) for delimiter in delimiters]) + 1
+            if stop > 0:
+                yield text[:stop]
+            carry = text[stop:]
+
+        if carry:
+            yield carry
+
+    @staticmethod
+    def markLast(iterable):
+        """loops through an iterable and marks the last item
+
+        Arguments:
+        iterable -- anything to loop through
+
+        Returns:
+        generator -- tuples of (item, is last item)
+
+        """
+        iterator = iter(iterable)
+        try:
+            previous = next(iterator)
+        except StopIteration:
+            return
+
+        for item in iterator:
+            yield previous, False
+            previous = item
+
+        yield previous, True
+
+    @staticmethod
+    def parseSize(value):
+        """turns a human readable size such as 512KB or 100MB into bytes
+
+        Arguments:
+        value -- size as a string
+
+        Returns:
+        int|None -- None if the size can't be understood
+
+        """
+        units = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2, "G": 1024 ** 3, "GB": 1024 ** 3}
+        match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*$', value)
+        if match is None or match.group(2).upper() not in units:
+            return None
+
+        return int(float(match.group(1)) * units[match.group(2).upper()])
+
+    @staticmethod
+    def encodeDict(dictionary, encoding = "utf-8"):
+        """turns the unicode keys and values json gives back into byte strings
+
+        Arguments:
+        dictionary -- dictionary of unicode strings
+        encoding -- encoding to use
+
+        Returns:
+        dict
+
+        """
+        encoded = {}
+        for key, value in dictionary.iteritems():
+            encoded[key.encode(encoding)] = value.encode(encoding)
+        return encoded
+
     @staticmethod
     def keyInTupleList(key, tuple_list):
         """checks a list of tuples for the given key"""
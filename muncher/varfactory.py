@@ -13,26 +13,34 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import math
+import string
 
 class VarFactory:
     """class to keep multiple counters and turn numeric counters into alphabetical ones"""
     types = {}
-    letters = map(chr, range(97, 123))
+
+    # css identifiers can't start with a digit or a hyphen so those only show up after the first character
+    first_letters = string.ascii_lowercase + string.ascii_uppercase + "_"
+    letters = first_letters + string.digits + "-"
+
+    # for tools that treat class names and ids as case insensitive
+    lowercase_first_letters = string.ascii_lowercase + "_"
+    lowercase_letters = lowercase_first_letters + string.digits + "-"
 
     @staticmethod
-    def getNext(type):
+    def getNext(type, lowercase = False):
         """gets the next letter name based on counter name
 
         Arguments:
         type -- name of counter we want the next value for
+        lowercase -- only use lowercase letters
 
         Returns:
         string
 
         """
         i = VarFactory.getVersion(type)
-        return VarFactory.getSmallName(i)
+        return VarFactory.getSmallName(i, lowercase)
 
     @staticmethod
     def getVersion(type):
@@ -54,36 +62,40 @@ class VarFactory:
         return VarFactory.types[type]
 
     @staticmethod
-    def getSmallName(index):
-        """gets a letter index based on the numeric index
+    def getSmallName(index, lowercase = False):
+        """gets a valid css identifier based on the numeric index
+
+        every index maps to a unique name and shorter names always come first,
+        so 0 is "a", 52 is "_" and 53 is "aa"
 
         Arguments:
         index -- the number you are looking for
+        lowercase -- only use lowercase letters
 
         Returns:
         string
 
         """
-        # total number of combinations for this index size
-        combinations = 0
-        letters = 0
-        while (combinations + (((letters - 1) * 26) - 1) < index):
-            letters += 1
-            combinations = int(math.pow(len(VarFactory.letters), letters))
-
-        if (index > 701):
-            raise Exception("until my math skillz get better we can only support 702 possibilities!")
-
-        a = int(index) + 1
-
-        if a < 27:
-            return chr(a + 96)
-
-        b = 0
-        while a > 26:
-            b += 1
-            a = a - 26
-
-        b = chr(b + 96)
-        a = chr(a + 96)
-        return b + a
+        if lowercase:
+            first_letters = VarFactory.lowercase_first_letters
+            letters = VarFactory.lowercase_letters
+        else:
+            first_letters = VarFactory.first_letters
+            letters = VarFactory.letters
+
+        # figure out how long the name is by skipping past all the shorter names
+        length = 1
+        combinations = len(first_letters)
+        while index >= combinations:
+            index -= combinations
+            combinations *= len(letters)
+            length += 1
+
+        name = []
+        for i in range(length - 1):
+            index, remainder = divmod(index, len(letters))
+            name.append(letters[remainder])
+
+        name.append(first_letters[index])
+        name.reverse()
+        return "".join(name)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os, time
+from util import Util
+from precompressor import Precompressor
+
+class Watcher(object):
+    """keeps a muncher running and re-munches files as they change
+
+    the counts for every file are kept in memory so a changed file only has to
+    be searched again by itself.  names keep their current assignment whenever
+    possible and only outputs that use a name that changed get rewritten.
+    files are checked by polling their modified time and size.
+    """
+    def __init__(self, muncher, interval = 0.5):
+        """constructor
+
+        Arguments:
+        muncher -- Muncher that has already run once with config.watch turned on
+        interval -- number of seconds between checks
+
+        Returns:
+        void
+
+        """
+        self.muncher = muncher
+        self.interval = interval
+        self.stats = {}
+        self.markup_names = {}
+        self.outputs = {}
+
+    def watch(self):
+        """checks for changes until the process is interrupted
+
+        Returns:
+        void
+
+        """
+        scan_files = self.getScanFiles()
+        self.stats = self.getStats(scan_files)
+        for path, type in scan_files.iteritems():
+            if type == "view":
+                self.updateMarkupNames(path)
+
+        self.outputs = self.getOutputs(self.muncher.getAllOptimizeTasks())
+
+        # savings were already reported for the first run
+        self.muncher.track_sizes = False
+
+        self.muncher.output("watching for changes (ctrl+c to stop)...", False)
+        try:
+            while True:
+                time.sleep(self.interval)
+                self.poll()
+        except KeyboardInterrupt:
+            self.muncher.output("", False)
+
+    def getScanFiles(self):
+        """gets every file that is being watched
+
+        Returns:
+        dict -- path to type ("css", "view", "js" or "manifest")
+
+        """
+        scan_files = dict((path, type) for type, path in self.muncher.getScanTasks())
+        if self.muncher.config.js_manifest is not None:
+            scan_files[self.muncher.config.js_manifest] = "manifest"
+
+        return scan_files
+
+    def getStats(self, paths):
+        """gets the modified time and size of files
+
+        Arguments:
+        paths -- list of paths
+
+        Returns:
+        dict -- path to (modified time, size) for every file that still exists
+
+        """
+        stats = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stats[path] = (stat.st_mtime, stat.st_size)
+
+        return stats
+
+    def getOutputs(self, tasks):
+        """gets where each file's optimized version is written
+
+        Arguments:
+        tasks -- list of optimize tasks
+
+        Returns:
+        dict -- path to new path
+
+        """
+        outputs = {}
+        for file, callback, minimize, new_path in tasks:
+            outputs[file] = new_path if new_path is not None else Util.prependExtension("opt", file)
+
+        return outputs
+
+    def updateMarkupNames(self, path):
+        """remembers the classes and ids used in a view's markup
+
+        Arguments:
+        path -- path to view
+
+        Returns:
+        void
+
+        """
+        if not Util.fileExists(path):
+            self.markup_names.pop(path, None)
+            return
+
+        self.markup_names[path] = self.muncher.getHtmlRewriter().getNames(self.muncher.documents.getContents(path))
+
+    def poll(self):
+        """checks for changed files once and re-munches them
+
+        Returns:
+        void
+
+        """
+        scan_files = self.getScanFiles()
+        stats = self.getStats(scan_files)
+        changed = [path for path in stats if self.stats.get(path) != stats[path]]
+        removed = [path for path in self.stats if path not in stats]
+        if not changed and not removed:
+            return
+
+        start = time.time()
+        self.stats = stats
+        muncher = self.muncher
+        for path in changed + removed:
+            muncher.documents.remove(path)
+
+        if muncher.config.js_manifest in changed:
+            # manifest counts are not tracked per file so everything has to be searched again
+            changed = [path for path in stats if scan_files[path] != "manifest"]
+            muncher.id_counter = {}
+            muncher.class_counter = {}
+            muncher.file_counters = {}
+            muncher.processFiles()
+            muncher.processJsManifest()
+        else:
+            for path in changed + removed:
+                counters = muncher.file_counters.pop(path, None)
+                if counters is not None:
+                    muncher.removeCounters(counters[0], counters[1])
+
+            for path in changed:
+                muncher.scanFile(scan_files[path], path)
+
+        for path in changed + removed:
+            if scan_files.get(path, "view") == "view":
+                self.updateMarkupNames(path)
+
+        # a class or id that starts or stops being used changes which css rules are kept
+        used_changed = False
+        if muncher.config.prune_unused:
+            old_used_names = muncher.used_names
+            muncher.processUsedNames()
+            used_changed = muncher.used_names != old_used_names
+
+        old_class_map = muncher.class_map
+        old_id_map = muncher.id_map
+        muncher.processMaps(old_class_map, old_id_map)
+        changed_names = Watcher.getChangedNames(old_class_map, muncher.class_map) | Watcher.getChangedNames(old_id_map, muncher.id_map)
+
+        tasks = muncher.getAllOptimizeTasks()
+        outputs = self.getOutputs(tasks)
+        for path in removed:
+            if path in self.outputs and path not in outputs:
+                muncher.output("removing " + self.outputs[path])
+                Util.unlink(self.outputs[path])
+                for name in muncher.config.precompress:
+                    Util.unlink(Precompressor.getPath(self.outputs[path], name))
+        self.outputs = outputs
+
+        changed = set(changed)
+        tasks = [task for task in tasks if task[0] in changed or self.usesNames(task[0], changed_names) or (used_changed and task[1] != "optimizeJavascript")]
+        muncher.runOptimizeTasks(tasks)
+
+        # the manifest is compressed in the same pool as everything else, so
+        # it has to be rewritten before the pools are closed, the same as in run()
+        if changed_names and muncher.config.js_manifest is not None:
+            muncher.optimizeJsManifest()
+
+        muncher.closeOptimizePool()
+        muncher.closeCompressPool()
+
+        elapsed = int((time.time() - start) * 1000)
+        muncher.output("re-munched " + str(len(tasks)) + " files (" + str(len(changed_names)) + " names changed) in " + str(elapsed) + " ms", False)
+
+    def usesNames(self, path, names):
+        """checks if a file uses any of the given classes or ids
+
+        Arguments:
+        path -- path to file
+        names -- set of classes and ids
+
+        Returns:
+        bool
+
+        """
+        if not names:
+            return False
+
+        counters = self.muncher.file_counters.get(path)
+        if counters is not None and (not names.isdisjoint(counters[0]) or not names.isdisjoint(counters[1])):
+            return True
+
+        return not names.isdisjoint(self.markup_names.get(path, ()))
+
+    @staticmethod
+    def getChangedNames(old_map, new_map):
+        """gets every name that was added, removed or given a different new name
+
+        Arguments:
+        old_map -- map before the change
+        new_map -- map after the change
+
+        Returns:
+        set
+
+        """
+        changed = set()
+        for name, new_name in old_map.iteritems():
+            if new_map.get(name) != new_name:
+                changed.add(name)
+
+        for name in new_map:
+            if name not in old_map:
+                changed.add(name)
+
+        return changed
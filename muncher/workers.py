@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# functions that run inside of multiprocessing worker processes
+#
+# these have to live at module level so multiprocessing can pickle them.
+# each worker builds its own Muncher once when the pool starts up.
+
+from util import Util
+from profiler import Profiler
+from sizetracker import SizeTracker
+from precompressor import Precompressor
+from documentstore import DocumentStore
+
+muncher = None
+track_sizes = False
+
+def initScanWorker(config):
+    """sets up a worker process for searching files for classes and ids
+
+    Arguments:
+    config -- Config object
+
+    Returns:
+    void
+
+    """
+    global muncher
+    from muncher import Muncher
+    muncher = Muncher(config)
+
+    # the files are rewritten by other processes so there is no point keeping them
+    muncher.documents = DocumentStore(0)
+
+def scanFile(task):
+    """searches a single file for classes and ids
+
+    Arguments:
+    task -- tuple of (type, path)
+
+    Returns:
+    tuple -- (id counter, class counter, seconds) for this file only
+
+    """
+    start = Profiler.timer()
+    id_counter, class_counter = muncher.getFileCounters(task[0], task[1])
+    return id_counter, class_counter, Profiler.timer() - start
+
+def initOptimizeWorker(config, class_map, id_map, used_names = None):
+    """sets up a worker process for rewriting files once the maps are done
+
+    Arguments:
+    config -- Config object
+    class_map -- final map of classes to new names
+    id_map -- final map of ids to new names
+    used_names -- classes and ids that css rules are kept for with --prune-unused
+
+    Returns:
+    void
+
+    """
+    global muncher, track_sizes
+    from muncher import Muncher
+    muncher = Muncher(config)
+    muncher.class_map = class_map
+    muncher.id_map = id_map
+    muncher.setUsedNames(used_names)
+
+    # sizes have to be added up in the parent process so they are sent back with each result
+    track_sizes = muncher.track_sizes
+    muncher.track_sizes = False
+
+def optimizeFile(task):
+    """rewrites a single file and saves it to disk
+
+    Arguments:
+    task -- tuple of (file, callback name, minimize, new path)
+
+    Returns:
+    tuple -- (file, new path, sizes, seconds) where sizes is None unless savings are tracked
+
+    """
+    file, callback, minimize, new_path = task
+    if new_path is None:
+        new_path = Util.prependExtension("opt", file)
+
+    start = Profiler.timer()
+    muncher.optimizeFile(file, getattr(muncher, callback), minimize, new_path)
+    seconds = Profiler.timer() - start
+
+    sizes = None
+    if track_sizes:
+        sizes = (SizeTracker.getSizes(file), SizeTracker.getSizes(new_path))
+
+    return file, new_path, sizes, seconds
+
+def compressFile(task):
+    """writes compressed copies of a munched file
+
+    Arguments:
+    task -- tuple of (path, list of compressor names)
+
+    Returns:
+    int -- number of copies written
+
+    """
+    return Precompressor.compressFile(task[0], task[1])
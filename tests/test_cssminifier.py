@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+from muncher.cssminifier import CssMinifier
+
+class CssMinifierTest(unittest.TestCase):
+    """checks that stylesheets read in pieces are minified the same as whole ones"""
+    stylesheets = [
+        ".a{x:y;;z:w}.b{c:d}",
+        "a/**/.b{x:y;/* c */;z:w}",
+        "a{margin:1px/**/2px;padding:1/**/.5em}",
+        "/*! license */\n@media screen and (max-width: 500px) {\n    .a > .b ~ .c, #d:hover {\n        color: red ;\n        background: url(img/*.png) , url( 'x y.png' );\n        content: \"  a ; b  }\";\n        width: calc(100% - 2px) !important;;\n    }\n    .x\\ y { font-family: \"Helvetica Neue\", Arial }\n}\n.empty { ; }\n",
+    ]
+
+    def testChunks(self):
+        for css in self.stylesheets:
+            whole = CssMinifier.minify(css)
+            for size in range(1, len(css) + 1):
+                chunks = [css[start:start + size] for start in range(0, len(css), size)]
+                self.assertEqual("".join(CssMinifier.minifyChunks(chunks)), whole, "%r in pieces of %d" % (css, size))
+
+    def testSemicolons(self):
+        self.assertEqual(CssMinifier.minify(".a{x:y;;z:w}.b{c:d}"), ".a{x:y;z:w}.b{c:d}")
+        self.assertEqual(CssMinifier.minify(".a{x:y;/* c */;z:w;}"), ".a{x:y;z:w}")
+
+    def testComments(self):
+        self.assertEqual(CssMinifier.minify("a{margin:1px/**/2px}"), "a{margin:1px 2px}")
+        self.assertEqual(CssMinifier.minify("a/**/.b{x:1/**/.5}"), "a.b{x:1 .5}")
+        self.assertEqual(CssMinifier.minify("/*! kept */a{b:c}"), "/*! kept */a{b:c}")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# Copyright 2011 Craig Campbell
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os, sys, shutil, tempfile, unittest
+from muncher.config import Config
+from muncher.muncher import Muncher
+
+class CssPrunerTest(unittest.TestCase):
+    """checks which names --prune-unused keeps, renames and reserves"""
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def munch(self, css, html, args = ()):
+        """munches one stylesheet and one view
+
+        Arguments:
+        css -- contents of the stylesheet
+        html -- contents of the view
+        args -- extra command line arguments
+
+        Returns:
+        tuple -- (munched css, munched html)
+
+        """
+        css_path = os.path.join(self.path, "style.css")
+        html_path = os.path.join(self.path, "view.html")
+        open(css_path, "w").write(css)
+        open(html_path, "w").write(html)
+
+        argv = sys.argv
+        sys.argv = ["munch", "--css", css_path, "--html", html_path, "--prune-unused"] + list(args)
+        try:
+            config = Config()
+            config.processArgs()
+        finally:
+            sys.argv = argv
+
+        Muncher(config).run()
+        return open(os.path.join(self.path, "style.opt.css")).read(), open(os.path.join(self.path, "view.opt.html")).read()
+
+    def testSafelist(self):
+        css, html = self.munch(".active{color:red}.btn-big{color:blue}.foo{color:green}", '<div class="foo"></div>', ["--safelist", ".active,btn-*"])
+        self.assertEqual(css, ".active{color:red}.btn-big{color:blue}.a{color:green}")
+
+    def testSafelistPatternsAreReserved(self):
+        css, html = self.munch(".foo{color:red}.bar{color:blue}", '<div class="foo bar"></div>', ["--safelist", "a*,b*"])
+        self.assertEqual(css, ".c{color:red}.bar{color:blue}")
+        self.assertEqual(html, '<div class="c bar"></div>')
+
+    def testNamesLeftInKeptRulesAreReserved(self):
+        css, html = self.munch(".a{} .foo:not(.a){}", '<div class="foo bar"></div>')
+        self.assertEqual(css, " .b:not(.a){}")
+        self.assertEqual(html, '<div class="b bar"></div>')
+
+if __name__ == "__main__":
+    unittest.main()